@@ -1,39 +1,150 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import text
 from sqlalchemy.orm import Session
+import numpy as np
+import pandas as pd
+import sys
+import os
+import threading
+from app.core.config import settings
 from app.core.database import get_db
 from app.api.deps import get_current_user
 from app.models.user import User
 
+# Add ml-engine to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../../../ml-engine")))
+
 router = APIRouter()
 
+MIN_HISTORY = 14
+
+HISTORY_QUERY = """
+    SELECT date, quantity
+    FROM demand_history
+    WHERE warehouse_id = :warehouse_id
+      AND item_id = :item_id
+    ORDER BY date
+"""
+
+FORECASTS_QUERY = """
+    SELECT item_id, forecast_date, predicted_quantity, confidence_lower, confidence_upper, model_type
+    FROM demand_forecasts
+    WHERE warehouse_id = :warehouse_id
+      AND forecast_date >= CURRENT_DATE
+    ORDER BY item_id, forecast_date
+    LIMIT :limit
+"""
+
+ACCURACY_QUERY = """
+    SELECT model_type, AVG(mape) AS mape, AVG(rmse) AS rmse, AVG(mae) AS mae, COUNT(DISTINCT item_id) AS items
+    FROM forecast_backtests
+    WHERE warehouse_id = :warehouse_id
+    GROUP BY model_type
+"""
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Fitted-model registry, built on first use so API startup does not import Prophet and statsmodels."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            from models.forecasting.model_registry import ModelRegistry
+            _registry = ModelRegistry(settings.FORECAST_MODEL_DIR)
+    return _registry
+
 
 @router.post("/predict")
 def create_forecast(
     warehouse_id: str,
     item_id: str,
     model_type: str = "prophet",
+    periods: int = 30,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Create demand forecast."""
+    """Create demand forecast, reusing the registered model when history is unchanged."""
+    registry = get_registry()
+    if model_type not in registry.MODEL_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"model_type must be one of {list(registry.MODEL_TYPES)}"
+        )
+
+    rows = db.execute(text(HISTORY_QUERY), {"warehouse_id": warehouse_id, "item_id": item_id}).fetchall()
+    if len(rows) < MIN_HISTORY:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At least {MIN_HISTORY} days of demand history are required"
+        )
+
+    history = pd.DataFrame(rows, columns=["date", "quantity"])
+    member_errors = None
+    if model_type == "ensemble":
+        from models.forecasting.backtest import load_member_errors
+        member_errors = load_member_errors(db.bind, warehouse_id, item_id).get((warehouse_id, item_id))
+    forecast, source = registry.forecast(warehouse_id, item_id, history, model_type, periods, member_errors)
+
+    def as_quantity(value):
+        return None if np.isnan(value) else max(float(value), 0.0)
+
     return {
         "message": "Forecast created",
         "model": model_type,
-        "predictions": []
+        "source": source,
+        "predictions": [
+            {
+                "date": pd.Timestamp(row.date).date().isoformat(),
+                "predicted_quantity": as_quantity(row.forecast),
+                "confidence_lower": as_quantity(row.lower_bound),
+                "confidence_upper": as_quantity(row.upper_bound)
+            }
+            for row in forecast.itertuples(index=False)
+        ]
     }
 
 
 @router.get("/{warehouse_id}")
 def get_forecasts(
     warehouse_id: str,
+    limit: int = 1000,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get forecasts for warehouse."""
+    """Get upcoming forecasts for warehouse with backtested accuracy per model."""
+    forecasts = db.execute(text(FORECASTS_QUERY), {"warehouse_id": warehouse_id, "limit": limit}).fetchall()
+    accuracy = db.execute(text(ACCURACY_QUERY), {"warehouse_id": warehouse_id}).fetchall()
+
+    by_model = {
+        row.model_type: {
+            # NULL when every backtested actual was zero
+            "mape": None if row.mape is None else float(row.mape),
+            "rmse": float(row.rmse),
+            "mae": float(row.mae),
+            "items": int(row.items)
+        }
+        for row in accuracy
+    }
+    best_model = min(by_model, key=lambda model: by_model[model]["mae"]) if by_model else None
+
     return {
-        "forecasts": [],
+        "forecasts": [
+            {
+                "item_id": str(row.item_id),
+                "date": row.forecast_date.isoformat(),
+                "predicted_quantity": float(row.predicted_quantity),
+                "confidence_lower": None if row.confidence_lower is None else float(row.confidence_lower),
+                "confidence_upper": None if row.confidence_upper is None else float(row.confidence_upper),
+                "model": row.model_type
+            }
+            for row in forecasts
+        ],
         "accuracy_metrics": {
-            "mape": 0,
-            "rmse": 0
+            "mape": by_model[best_model]["mape"] if best_model else None,
+            "rmse": by_model[best_model]["rmse"] if best_model else None,
+            "best_model": best_model,
+            "models": by_model
         }
     }
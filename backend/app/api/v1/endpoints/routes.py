@@ -1,29 +1,116 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+import json
+import sys
+import os
 from app.core.database import get_db
 from app.api.deps import get_current_user
 from app.models.user import User
+from app.models.warehouse import Warehouse
+from app.core.config import settings
+from app.schemas.route import BatchRouteRequest, Location
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+# Add ml-engine to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../../../ml-engine")))
+
+from models.optimization.route_optimizer import RouteOptimizer
+from models.optimization.batch_router import BatchRouter, create_route_pool, solve_order
 
 router = APIRouter()
 
+# One worker pool for every batch request; started and stopped with the app
+route_pool: Optional[ProcessPoolExecutor] = None
+
+
+def start_route_pool():
+    global route_pool
+    if route_pool is None:
+        route_pool = create_route_pool(settings.ROUTE_POOL_WORKERS)
+
+
+def stop_route_pool():
+    global route_pool
+    if route_pool is not None:
+        route_pool.shutdown(wait=False, cancel_futures=True)
+        route_pool = None
+
+
+def _get_warehouse(db: Session, warehouse_id) -> Warehouse:
+    warehouse = db.query(Warehouse).filter(Warehouse.id == warehouse_id).first()
+    if not warehouse:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Warehouse not found"
+        )
+    return warehouse
+
 
 @router.post("/optimize")
 def optimize_route(
     warehouse_id: str,
-    start_location: dict,
-    end_location: dict,
-    waypoints: list = [],
+    start_location: Location,
+    end_location: Location,
+    waypoints: List[Location] = [],
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Optimize route using OR-Tools."""
+    warehouse = _get_warehouse(db, warehouse_id)
+    optimizer = RouteOptimizer(warehouse.grid_width, warehouse.grid_height)
+    result = solve_order(optimizer, {
+        'start_location': (start_location.x, start_location.y),
+        'end_location': (end_location.x, end_location.y),
+        'pick_locations': [(point.x, point.y) for point in waypoints]
+    })
+
     return {
-        "optimized_route": [],
-        "total_distance": 0,
-        "estimated_time": 0
+        "optimized_route": [{"x": x, "y": y} for x, y in result['route']],
+        "total_distance": result['total_distance'],
+        "estimated_time": result.get('estimated_time_seconds', 0)
     }
 
 
+@router.post("/optimize/batch")
+def optimize_routes_batch(
+    request: BatchRouteRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Route many orders in parallel, streaming one NDJSON line per order as it finishes.
+    """
+    warehouse = _get_warehouse(db, request.warehouse_id)
+    batch_router = BatchRouter(
+        warehouse.grid_width,
+        warehouse.grid_height,
+        time_budget_per_order=request.time_budget_per_order,
+        small_order_threshold=request.small_order_threshold,
+        pool=route_pool
+    )
+
+    orders = []
+    for order in request.orders:
+        start = order.start_location or request.start_location
+        end = order.end_location or request.end_location or start
+        orders.append({
+            'order_id': order.order_id,
+            'start_location': (start.x, start.y),
+            'end_location': (end.x, end.y),
+            'pick_locations': [(point.x, point.y) for point in order.pick_locations],
+            'time_limit_seconds': order.time_limit_seconds
+        })
+
+    def stream():
+        for result in batch_router.solve(orders):
+            result['route'] = [{"x": x, "y": y} for x, y in result['route']]
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 @router.get("/{warehouse_id}")
 def get_routes(
     warehouse_id: str,
@@ -1,16 +1,29 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException
 # Trigger reload
 from typing import Any
+import asyncio
 import sys
 import os
+from app.core.config import settings
 
 # Add ml-engine to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../../../ml-engine")))
 
-from models.vision.product_classifier import classifier
+from models.vision.inference_batcher import InferenceBatcher, InferenceOverloaded
+from models.vision.model_provider import ModelNotReady, product_classifier as provider
 
 router = APIRouter()
 
+# Concurrent scans share forward passes on the batcher's own thread, so decoding and inference never block the event loop;
+# the model loads on the first batch unless the startup warm-up already has. Items are (image bytes, cache signature).
+batcher = InferenceBatcher(
+    lambda items: provider.get().predict_batch([contents for contents, _ in items], [signature for _, signature in items]),
+    max_batch_size=settings.VISION_MAX_BATCH_SIZE,
+    max_wait_seconds=settings.VISION_MAX_WAIT_MS / 1000,
+    name="vision",
+    max_queue=settings.VISION_MAX_QUEUE
+)
+
 @router.post("/scan", response_model=dict)
 async def scan_product(file: UploadFile = File(...)) -> Any:
     """
@@ -20,9 +33,37 @@ async def scan_product(file: UploadFile = File(...)) -> Any:
         raise HTTPException(status_code=400, detail="File must be an image")
     
     contents = await file.read()
-    result = classifier.predict(contents)
+    
+    # Re-scans are answered from the result cache without waiting for a batch; hashing runs off the event loop
+    signature = None
+    if provider.status()["ready"]:
+        signature, cached = await asyncio.get_running_loop().run_in_executor(None, provider.get().cached_result, contents)
+        if cached is not None:
+            return cached
+    
+    try:
+        result = await asyncio.wrap_future(batcher.submit((contents, signature)))
+    except InferenceOverloaded as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "1"})
+    except ModelNotReady as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
     
     if not result:
         raise HTTPException(status_code=500, detail="Failed to process image")
         
     return result
+
+
+@router.get("/metrics", response_model=dict)
+async def vision_metrics() -> Any:
+    """
+    Batching, queue-wait, inference-time and result-cache metrics for the scan endpoint.
+    """
+    status = provider.status()
+    # Only report the cache of a loaded model; asking for it must not trigger a load
+    cache = provider.get().cache if status["ready"] else None
+    return {
+        "model": status,
+        "batcher": batcher.stats(),
+        "cache": cache.stats() if cache is not None else None
+    }
@@ -1,5 +1,6 @@
 import os
 from typing import Optional
+from pydantic import field_validator
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 
@@ -38,6 +39,13 @@ class Settings(BaseSettings):
     
     # ML Models
     MODEL_DIR: str = "models"
+    # Fitted forecast models; absolute so they never land in the (bind-mounted) working directory
+    FORECAST_MODEL_DIR: str = "/var/lib/smartwarex/forecast-models"
+    VISION_WARMUP: bool = True
+    VISION_MAX_BATCH_SIZE: int = 16
+    VISION_MAX_WAIT_MS: float = 10.0
+    VISION_MAX_QUEUE: int = 64
+    ROUTE_POOL_WORKERS: int = 2
     
     # Pagination
     DEFAULT_PAGE_SIZE: int = 20
@@ -54,6 +62,13 @@ class Settings(BaseSettings):
     ENABLE_METRICS: bool = True
     LOG_LEVEL: str = "INFO"
     
+    @field_validator("FORECAST_MODEL_DIR")
+    @classmethod
+    def require_absolute_path(cls, value: str) -> str:
+        if not os.path.isabs(value):
+            raise ValueError("must be an absolute path")
+        return value
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -3,6 +3,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from app.core.config import settings
 from app.api.v1.api import api_router
+from app.api.v1.endpoints import routes, vision
 import time
 import logging
 
@@ -54,13 +55,39 @@ async def global_exception_handler(request: Request, exc: Exception):
     )
 
 
+# Load vision models in the background so workers serve requests immediately
+@app.on_event("startup")
+async def warm_up_models():
+    if settings.VISION_WARMUP:
+        vision.provider.start_warmup()
+
+
+# Share one route-solving process pool across batch requests
+@app.on_event("startup")
+async def start_route_pool():
+    routes.start_route_pool()
+
+
+@app.on_event("shutdown")
+async def stop_route_pool():
+    routes.stop_route_pool()
+
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
+    vision_status = vision.provider.status()
     return {
         "status": "healthy",
         "app": settings.APP_NAME,
-        "version": settings.APP_VERSION
+        "version": settings.APP_VERSION,
+        "ready": vision_status["ready"],
+        "models": {
+            "vision": vision_status
+        },
+        "inference": {
+            "vision": vision.batcher.stats()
+        }
     }
 
 
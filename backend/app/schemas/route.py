@@ -0,0 +1,25 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from uuid import UUID
+
+
+class Location(BaseModel):
+    x: int = Field(..., ge=0)
+    y: int = Field(..., ge=0)
+
+
+class RouteOrder(BaseModel):
+    order_id: str
+    pick_locations: List[Location]
+    start_location: Optional[Location] = None
+    end_location: Optional[Location] = None
+    time_limit_seconds: Optional[float] = Field(None, gt=0)
+
+
+class BatchRouteRequest(BaseModel):
+    warehouse_id: UUID
+    start_location: Location
+    end_location: Optional[Location] = None
+    orders: List[RouteOrder] = Field(..., min_length=1)
+    time_budget_per_order: float = Field(1.0, gt=0, le=60)
+    small_order_threshold: int = Field(12, ge=0)
@@ -124,12 +124,27 @@ CREATE TABLE demand_forecasts (
     predicted_quantity INTEGER NOT NULL,
     confidence_lower INTEGER,
     confidence_upper INTEGER,
-    model_type VARCHAR(50) CHECK (model_type IN ('prophet', 'arima', 'lstm', 'ensemble')),
+    model_type VARCHAR(50) CHECK (model_type IN ('prophet', 'arima', 'lstm', 'ensemble', 'holt_winters', 'croston', 'sba', 'tsb')),
     accuracy_score DECIMAL(5, 4),
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     UNIQUE(warehouse_id, item_id, forecast_date, model_type)
 );
 
+-- Forecast Backtests (rolling-origin accuracy per model and horizon step)
+CREATE TABLE forecast_backtests (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    warehouse_id UUID REFERENCES warehouses(id),
+    item_id UUID REFERENCES items(id),
+    model_type VARCHAR(50) CHECK (model_type IN ('prophet', 'arima', 'lstm', 'ensemble', 'holt_winters', 'croston', 'sba', 'tsb')),
+    horizon INTEGER NOT NULL,
+    n_windows INTEGER NOT NULL,
+    mape DOUBLE PRECISION,
+    rmse DOUBLE PRECISION,
+    mae DOUBLE PRECISION,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(warehouse_id, item_id, model_type, horizon)
+);
+
 -- Suppliers
 CREATE TABLE suppliers (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -319,6 +334,7 @@ CREATE INDEX idx_transactions_item ON inventory_transactions(item_id);
 CREATE INDEX idx_transactions_date ON inventory_transactions(created_at);
 CREATE INDEX idx_demand_history_date ON demand_history(date);
 CREATE INDEX idx_demand_forecasts_date ON demand_forecasts(forecast_date);
+CREATE INDEX idx_forecast_backtests_warehouse ON forecast_backtests(warehouse_id);
 CREATE INDEX idx_po_supplier ON purchase_orders(supplier_id);
 CREATE INDEX idx_po_warehouse ON purchase_orders(warehouse_id);
 CREATE INDEX idx_po_status ON purchase_orders(status);
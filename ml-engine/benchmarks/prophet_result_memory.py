@@ -0,0 +1,77 @@
+"""
+Benchmark per-series cost of full vs. lean forecast_prophet results
+
+Run from ml-engine/:
+    PYTHONPATH=. python benchmarks/prophet_result_memory.py --series 10 --days 730
+"""
+import argparse
+import logging
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+import matplotlib
+
+matplotlib.use('Agg')
+
+from models.forecasting.prophet_model import DemandForecaster
+
+
+def synthetic_series(rng: np.random.Generator, days: int) -> pd.DataFrame:
+    t = np.arange(days)
+    level = rng.uniform(50, 200)
+    demand = level + 0.05 * t + 0.2 * level * np.sin(2 * np.pi * t / 7) + rng.normal(0, 5, days)
+    return pd.DataFrame({'date': pd.date_range('2022-01-01', periods=days, freq='D'), 'quantity': demand})
+
+
+def measure(series, lean: bool, periods: int):
+    """Seconds per series and bytes still held by the results once every series is done."""
+    forecaster = DemandForecaster()
+    results = []
+    tracemalloc.start()
+    baseline = tracemalloc.take_snapshot()
+    started = time.perf_counter()
+
+    for data in series:
+        results.append(forecaster.forecast_prophet(data, periods=periods, lean=lean))
+    forecaster.prophet_model = None
+
+    elapsed = time.perf_counter() - started
+    retained = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(baseline, 'filename'))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'seconds_per_series': elapsed / len(series),
+        'retained_bytes_per_series': retained / len(series),
+        'peak_bytes': peak
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--series', type=int, default=10)
+    parser.add_argument('--days', type=int, default=730)
+    parser.add_argument('--periods', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    logging.getLogger('cmdstanpy').addHandler(logging.NullHandler())
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+    logging.getLogger('prophet').setLevel(logging.WARNING)
+
+    rng = np.random.default_rng(args.seed)
+    series = [synthetic_series(rng, args.days) for _ in range(args.series)]
+
+    # Warm up Stan and matplotlib so one-off import costs are not charged to either mode
+    DemandForecaster().forecast_prophet(series[0], periods=args.periods)
+
+    for name, lean in (('full', False), ('lean', True)):
+        stats = measure(series, lean, args.periods)
+        print(f"{name:>4}: {stats['seconds_per_series'] * 1000:7.1f} ms/series, "
+              f"{stats['retained_bytes_per_series'] / 1024:9.1f} KiB retained/series, "
+              f"{stats['peak_bytes'] / 1024 ** 2:6.1f} MiB peak")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark OR-Tools arc-cost evaluation: Python callbacks vs. registered matrices
+
+Run from ml-engine/:
+    PYTHONPATH=. python benchmarks/route_callbacks.py --stops 50 100 200 --seconds 2
+"""
+import argparse
+import time
+import numpy as np
+from ortools.constraint_solver import routing_enums_pb2
+from ortools.constraint_solver import pywrapcp
+
+from models.optimization.route_optimizer import RouteOptimizer
+
+
+def legacy_distance_matrix(optimizer: RouteOptimizer, locations):
+    """Nested-list matrix built the way RouteOptimizer used to."""
+    n = len(locations)
+    matrix = [[0] * n for _ in range(n)]
+    for i in range(n):
+        for j in range(n):
+            if i != j:
+                matrix[i][j] = optimizer.manhattan_distance(locations[i], locations[j])
+    return matrix
+
+
+def solve(distance_matrix, seconds: int, use_matrix: bool):
+    """Solve one TSP and report solver throughput."""
+    manager = pywrapcp.RoutingIndexManager(len(distance_matrix), 1, 0)
+    routing = pywrapcp.RoutingModel(manager)
+    calls = [0]
+
+    if use_matrix:
+        transit_callback_index = routing.RegisterTransitMatrix(np.asarray(distance_matrix).tolist())
+    else:
+        def distance_callback(from_index, to_index):
+            calls[0] += 1
+            return distance_matrix[manager.IndexToNode(from_index)][manager.IndexToNode(to_index)]
+        transit_callback_index = routing.RegisterTransitCallback(distance_callback)
+    routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
+
+    search_parameters = pywrapcp.DefaultRoutingSearchParameters()
+    search_parameters.first_solution_strategy = routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC
+    search_parameters.local_search_metaheuristic = routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH
+    search_parameters.time_limit.seconds = seconds
+
+    start = time.perf_counter()
+    solution = routing.SolveWithParameters(search_parameters)
+    elapsed = time.perf_counter() - start
+    solver = routing.solver()
+
+    return {
+        'objective': solution.ObjectiveValue() if solution else None,
+        'python_callbacks_per_sec': calls[0] / elapsed,
+        'branches_per_sec': solver.Branches() / elapsed,
+        'solutions': solver.Solutions()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--stops', type=int, nargs='+', default=[50, 100, 200])
+    parser.add_argument('--seconds', type=int, default=2)
+    parser.add_argument('--grid', type=int, nargs=2, default=[200, 100])
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    optimizer = RouteOptimizer(*args.grid)
+
+    for n_stops in args.stops:
+        xs = rng.integers(0, args.grid[0], n_stops + 1)
+        ys = rng.integers(0, args.grid[1], n_stops + 1)
+        locations = list(zip(xs.tolist(), ys.tolist()))
+
+        start = time.perf_counter()
+        legacy = legacy_distance_matrix(optimizer, locations)
+        loop_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        matrix = optimizer.create_distance_matrix(locations)
+        numpy_ms = (time.perf_counter() - start) * 1000
+        assert np.array_equal(np.asarray(legacy), matrix)
+
+        before = solve(legacy, args.seconds, use_matrix=False)
+        after = solve(matrix, args.seconds, use_matrix=True)
+
+        print(f"\n{n_stops} stops")
+        print(f"  matrix build: loop {loop_ms:.1f} ms, numpy {numpy_ms:.2f} ms")
+        print(f"  callback: {before['python_callbacks_per_sec']:,.0f} Python callbacks/s, "
+              f"{before['branches_per_sec']:,.0f} branches/s, {before['solutions']} solutions, "
+              f"objective {before['objective']}")
+        print(f"  matrix:   {after['python_callbacks_per_sec']:,.0f} Python callbacks/s, "
+              f"{after['branches_per_sec']:,.0f} branches/s, {after['solutions']} solutions, "
+              f"objective {after['objective']}")
+
+
+if __name__ == "__main__":
+    main()
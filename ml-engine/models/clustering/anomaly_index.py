@@ -0,0 +1,201 @@
+"""
+Incremental density-based anomaly detection over a spatial index
+"""
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import KDTree
+from sklearn.preprocessing import StandardScaler
+from typing import Dict, Hashable, List, Sequence, Set, Tuple
+
+
+class SpatialAnomalyIndex:
+    """
+    Grid-bucket index over standardized item features.
+
+    An item is anomalous exactly when DBSCAN would label it noise: it has
+    fewer than ``min_samples`` neighbours within ``eps`` (itself included)
+    and none of its neighbours is a core point. Buckets are ``eps`` wide, so
+    every neighbour of a point lies in one of the 3^d surrounding buckets
+    and inserting, moving or checking an item touches only that
+    neighbourhood. The scaler is fitted once in ``build`` and then frozen.
+    """
+
+    FEATURES = ('x', 'y', 'movement_freq')
+
+    def __init__(self, eps: float = 0.5, min_samples: int = 5, features: Sequence[str] = FEATURES):
+        self.eps = eps
+        self.min_samples = min_samples
+        self.features = list(features)
+        self.scaler = StandardScaler()
+        self.points = np.empty((0, len(self.features)))
+        self.raw = np.empty((0, len(self.features)))
+        self.counts = np.empty(0, dtype=np.int64)
+        self.active = np.empty(0, dtype=bool)
+        self.ids: List[Hashable] = []
+        self.row_of: Dict[Hashable, int] = {}
+        self.buckets: Dict[Tuple[int, ...], Set[int]] = {}
+        offsets = np.array(np.meshgrid(*[[-1, 0, 1]] * len(self.features), indexing='ij'))
+        self._offsets = offsets.reshape(len(self.features), -1).T
+
+    def build(self, item_data: pd.DataFrame) -> 'SpatialAnomalyIndex':
+        """
+        Fit the scaler and index every item in one vectorized pass.
+
+        Args:
+            item_data: DataFrame with the feature columns and optionally ``item_id``
+        """
+        raw = item_data[self.features].to_numpy(dtype=np.float64)
+        ids = item_data['item_id'].tolist() if 'item_id' in item_data.columns else item_data.index.tolist()
+
+        self.points = self.scaler.fit_transform(raw)
+        self.raw = raw.copy()
+        self.ids = list(ids)
+        self.row_of = {item_id: row for row, item_id in enumerate(self.ids)}
+        self.active = np.ones(len(raw), dtype=bool)
+        self.counts = KDTree(self.points).query_radius(self.points, self.eps, count_only=True).astype(np.int64)
+
+        self.buckets = {}
+        cells = self._cells(self.points)
+        unique_cells, inverse = np.unique(cells, axis=0, return_inverse=True)
+        order = np.argsort(inverse.ravel(), kind='stable')
+        bounds = np.cumsum(np.bincount(inverse.ravel(), minlength=len(unique_cells)))[:-1]
+        for cell, rows in zip(map(tuple, unique_cells.tolist()), np.split(order, bounds)):
+            self.buckets[cell] = set(rows.tolist())
+        return self
+
+    def anomaly_mask(self) -> np.ndarray:
+        """Noise flag for every row slot (removed and spare rows are False)."""
+        core = self.active & (self.counts >= self.min_samples)
+        candidates = np.flatnonzero(self.active & ~core)
+        mask = np.zeros(len(self.active), dtype=bool)
+        if len(candidates) == 0:
+            return mask
+        if not core.any():
+            mask[candidates] = True
+            return mask
+
+        near_core = KDTree(self.points[core]).query_radius(self.points[candidates], self.eps, count_only=True)
+        mask[candidates[near_core == 0]] = True
+        return mask
+
+    def anomalies(self) -> List[Hashable]:
+        """IDs of every item currently flagged as anomalous."""
+        return [self.ids[row] for row in np.flatnonzero(self.anomaly_mask())]
+
+    def upsert(self, item_id: Hashable, features: Sequence[float]) -> Dict:
+        """
+        Insert a new item or move an existing one, then check it.
+
+        Args:
+            item_id: Item identifier
+            features: Raw values in the order of ``self.features``
+
+        Returns:
+            Dictionary with the item's anomaly flag and neighbour count
+        """
+        row = self.row_of.get(item_id)
+        if row is not None:
+            self.remove(item_id)
+        else:
+            row = len(self.ids)
+            if row == len(self.active):
+                self._grow(max(16, 2 * row))
+            self.ids.append(item_id)
+
+        raw = np.asarray(features, dtype=np.float64)
+        point = (raw - self.scaler.mean_) / self.scaler.scale_
+        neighbours = self._neighbours(point)
+
+        self.row_of[item_id] = row
+        self.points[row] = point
+        self.raw[row] = raw
+        self.active[row] = True
+        self.counts[row] = len(neighbours) + 1
+        self.counts[neighbours] += 1
+        self.buckets.setdefault(self._cell(point), set()).add(row)
+
+        return self.check(item_id)
+
+    def remove(self, item_id: Hashable):
+        """Drop an item from the index and update its neighbours' counts."""
+        row = self.row_of.pop(item_id)
+        self.buckets[self._cell(self.points[row])].discard(row)
+        self.active[row] = False
+        neighbours = self._neighbours(self.points[row])
+        self.counts[neighbours] -= 1
+
+    def check(self, item_id: Hashable) -> Dict:
+        """Anomaly flag for one item, looking only at its neighbourhood."""
+        row = self.row_of[item_id]
+        neighbours = self._neighbours(self.points[row])
+        neighbours = neighbours[neighbours != row]
+        is_core = self.counts[row] >= self.min_samples
+        near_core = bool((self.counts[neighbours] >= self.min_samples).any())
+        return {
+            'item_id': item_id,
+            'is_anomaly': not is_core and not near_core,
+            'neighbor_count': int(len(neighbours))
+        }
+
+    def zone_summary(self, zones: List[Dict]) -> Dict[str, Dict]:
+        """
+        Group anomalies by warehouse zone.
+
+        Args:
+            zones: Dicts with zone_name, x_start, y_start, x_end, y_end (inclusive)
+
+        Returns:
+            Mapping zone name -> anomaly IDs and counts; items outside every zone
+            are reported under 'unzoned'
+        """
+        mask = self.anomaly_mask()
+        x = self.raw[:, self.features.index('x')]
+        y = self.raw[:, self.features.index('y')]
+        unzoned = self.active.copy()
+        summary = {}
+
+        for zone in zones:
+            inside = self.active & (x >= zone['x_start']) & (x <= zone['x_end']) & (y >= zone['y_start']) & (y <= zone['y_end'])
+            unzoned &= ~inside
+            summary[zone['zone_name']] = self._summarize(inside, mask)
+
+        summary['unzoned'] = self._summarize(unzoned, mask)
+        return summary
+
+    def _grow(self, capacity: int):
+        """Reserve room for more rows so inserts stay amortized O(1)."""
+        size = len(self.active)
+        points = np.zeros((capacity, self.points.shape[1]))
+        raw = np.zeros((capacity, self.raw.shape[1]))
+        points[:size], raw[:size] = self.points, self.raw
+        self.points, self.raw = points, raw
+        self.active = np.concatenate((self.active, np.zeros(capacity - size, dtype=bool)))
+        self.counts = np.concatenate((self.counts, np.zeros(capacity - size, dtype=np.int64)))
+
+    def _summarize(self, members: np.ndarray, mask: np.ndarray) -> Dict:
+        flagged = np.flatnonzero(members & mask)
+        return {
+            'anomalies': [self.ids[row] for row in flagged],
+            'anomaly_count': int(len(flagged)),
+            'normal_count': int(members.sum() - len(flagged))
+        }
+
+    def _cells(self, points: np.ndarray) -> np.ndarray:
+        return np.floor(points / self.eps).astype(np.int64)
+
+    def _cell(self, point: np.ndarray) -> Tuple[int, ...]:
+        return tuple(self._cells(point[None, :])[0].tolist())
+
+    def _neighbours(self, point: np.ndarray) -> np.ndarray:
+        """Active rows within eps of ``point`` (including the point's own row if indexed)."""
+        base = self._cells(point[None, :])[0]
+        rows = [
+            row
+            for offset in self._offsets
+            for row in self.buckets.get(tuple((base + offset).tolist()), ())
+        ]
+        if not rows:
+            return np.empty(0, dtype=np.int64)
+        rows = np.fromiter(rows, dtype=np.int64, count=len(rows))
+        dist = np.sqrt(((self.points[rows] - point) ** 2).sum(axis=1))
+        return rows[dist <= self.eps]
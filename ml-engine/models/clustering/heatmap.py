@@ -0,0 +1,156 @@
+"""
+Columnar movement heatmap aggregation
+"""
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, List, Tuple, Union
+
+
+MovementInput = Union[pd.DataFrame, Iterable[pd.DataFrame]]
+
+
+def iter_chunks(movement_data: MovementInput) -> Iterable[pd.DataFrame]:
+    """Yield movement chunks from a DataFrame or an iterable of DataFrames."""
+    if isinstance(movement_data, pd.DataFrame):
+        yield movement_data
+    else:
+        yield from movement_data
+
+
+class MovementHeatmap:
+    """
+    Accumulate per-location movement frequency with bincount aggregation.
+
+    Every movement row adds its weight to both its origin and destination
+    cell. Chunks can be folded in one at a time, so memory stays bounded by
+    the chunk size plus one grid.
+    """
+
+    _UNSEEN = np.iinfo(np.int64).max
+
+    def __init__(self, grid_width: int, grid_height: int, weight_col: str = 'frequency'):
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.weight_col = weight_col
+        self.counts = np.zeros(grid_height * grid_width)
+        # Order in which each location was first touched, used to break
+        # hotspot ties the same way the row-by-row implementation did
+        self.first_seen = np.full(grid_height * grid_width, self._UNSEEN, dtype=np.int64)
+        self.off_grid: Dict[Tuple[int, int], List] = {}
+        self.total_movements = 0
+        self.rows_seen = 0
+        self.integer_weights = True
+
+    def update(self, chunk: pd.DataFrame) -> 'MovementHeatmap':
+        """
+        Fold one chunk of movements into the heatmap.
+
+        Args:
+            chunk: DataFrame with columns [from_x, from_y, to_x, to_y, <weight_col>]
+
+        Returns:
+            self, so calls can be chained
+        """
+        n = len(chunk)
+        if n == 0:
+            return self
+
+        weights = chunk[self.weight_col].to_numpy()
+        if not np.issubdtype(weights.dtype, np.integer):
+            self.integer_weights = False
+        weights = weights.astype(np.float64)
+
+        xs, ys, inside = self._endpoints(chunk)
+        w = np.repeat(weights, 2)
+        offset = 2 * self.rows_seen
+        flat = ys[inside] * self.grid_width + xs[inside]
+
+        self.counts += np.bincount(flat, weights=w[inside], minlength=self.counts.size)
+
+        cells, first_idx = np.unique(flat, return_index=True)
+        positions = np.flatnonzero(inside)[first_idx] + offset
+        new = self.first_seen[cells] == self._UNSEEN
+        self.first_seen[cells[new]] = positions[new]
+
+        if not inside.all():
+            self._update_off_grid(xs[~inside], ys[~inside], w[~inside], np.flatnonzero(~inside) + offset)
+
+        self.total_movements += weights.sum()
+        self.rows_seen += n
+        return self
+
+    def update_many(self, movement_data: MovementInput) -> 'MovementHeatmap':
+        """Fold a DataFrame or an iterable of DataFrame chunks into the heatmap."""
+        for chunk in iter_chunks(movement_data):
+            self.update(chunk)
+        return self
+
+    def cell_counts(self, chunk: pd.DataFrame, weights: np.ndarray) -> np.ndarray:
+        """
+        Aggregate per-row weights onto the flattened grid without updating state.
+
+        Args:
+            chunk: DataFrame with columns [from_x, from_y, to_x, to_y]
+            weights: One weight per row
+
+        Returns:
+            Array of length grid_height * grid_width
+        """
+        xs, ys, inside = self._endpoints(chunk)
+        flat = ys[inside] * self.grid_width + xs[inside]
+        w = np.repeat(np.asarray(weights, dtype=np.float64), 2)
+        return np.bincount(flat, weights=w[inside], minlength=self.counts.size)
+
+    def _endpoints(self, chunk: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Interleave endpoints as (from_0, to_0, from_1, to_1, ...) to match row order."""
+        xs = np.column_stack((chunk['from_x'].to_numpy(), chunk['to_x'].to_numpy())).ravel().astype(np.int64)
+        ys = np.column_stack((chunk['from_y'].to_numpy(), chunk['to_y'].to_numpy())).ravel().astype(np.int64)
+        inside = (xs >= 0) & (xs < self.grid_width) & (ys >= 0) & (ys < self.grid_height)
+        return xs, ys, inside
+
+    def _update_off_grid(self, xs: np.ndarray, ys: np.ndarray, w: np.ndarray, positions: np.ndarray):
+        """Track locations outside the grid; they still count towards hotspots."""
+        pairs = np.column_stack((xs, ys))
+        unique_pairs, first_idx, inverse = np.unique(pairs, axis=0, return_index=True, return_inverse=True)
+        sums = np.bincount(inverse.ravel(), weights=w, minlength=len(unique_pairs))
+
+        for (x, y), freq, pos in zip(unique_pairs.tolist(), sums, positions[first_idx]):
+            entry = self.off_grid.setdefault((x, y), [0.0, int(pos)])
+            entry[0] += freq
+
+    @property
+    def heatmap(self) -> np.ndarray:
+        """Movement frequency per cell with shape (grid_height, grid_width)."""
+        return self.counts.reshape(self.grid_height, self.grid_width).copy()
+
+    def hotspots(self, top_n: int = 10) -> List[Tuple[Tuple[int, int], float]]:
+        """
+        Return the busiest locations, highest frequency first.
+
+        Ties are broken by the order in which locations first appeared.
+        """
+        seen = np.flatnonzero(self.first_seen != self._UNSEEN)
+        freqs = self.counts[seen]
+        order_keys = self.first_seen[seen]
+        xs = seen % self.grid_width
+        ys = seen // self.grid_width
+
+        if self.off_grid:
+            extra = np.array([(x, y, f, p) for (x, y), (f, p) in self.off_grid.items()])
+            xs = np.concatenate((xs, extra[:, 0].astype(np.int64)))
+            ys = np.concatenate((ys, extra[:, 1].astype(np.int64)))
+            freqs = np.concatenate((freqs, extra[:, 2]))
+            order_keys = np.concatenate((order_keys, extra[:, 3].astype(np.int64)))
+
+        top = np.lexsort((order_keys, -freqs))[:top_n]
+        cast = int if self.integer_weights else float
+        return [((int(xs[i]), int(ys[i])), cast(freqs[i])) for i in top]
+
+    def summary(self, top_n: int = 10) -> Dict:
+        """Return heatmap, hotspots and total movements."""
+        total = self.total_movements
+        return {
+            'heatmap': self.heatmap,
+            'hotspots': self.hotspots(top_n),
+            'total_movements': int(total) if self.integer_weights else total
+        }
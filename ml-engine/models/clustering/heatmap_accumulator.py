@@ -0,0 +1,250 @@
+"""
+Incremental, persistent movement heatmaps per warehouse
+"""
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional
+
+from models.clustering.heatmap import MovementHeatmap, MovementInput, iter_chunks
+
+
+# Half-life in seconds of each rolling grid
+DEFAULT_HALF_LIVES = {
+    'hourly': 3600.0,
+    'daily': 86400.0,
+    'weekly': 7 * 86400.0
+}
+
+MOVEMENTS_QUERY = """
+    SELECT id, from_x, from_y, to_x, to_y, quantity, created_at
+    FROM item_movements
+    WHERE warehouse_id = :warehouse_id
+      AND created_at > :since
+      AND from_x IS NOT NULL AND from_y IS NOT NULL
+      AND to_x IS NOT NULL AND to_y IS NOT NULL
+    ORDER BY created_at
+"""
+
+
+def _to_utc(value) -> pd.Timestamp:
+    """Coerce a timestamp-like value to a UTC Timestamp."""
+    ts = pd.Timestamp(value)
+    return ts.tz_localize('UTC') if ts.tzinfo is None else ts.tz_convert('UTC')
+
+
+class HeatmapAccumulator:
+    """
+    Fold new item movements into a warehouse heatmap since a stored watermark.
+
+    Keeps an all-time heatmap plus exponentially decayed hourly, daily and
+    weekly grids, so layout analysis only pays for rows newer than the
+    watermark. State can be saved to and restored from a compressed ``.npz``.
+
+    Rows may arrive out of order or commit late: anything up to
+    ``lateness_seconds`` older than the watermark is still folded in, and the
+    keys of rows inside that window (the ``id`` column, or a hash of the row)
+    are remembered so re-reading the overlap never counts a row twice.
+    """
+
+    def __init__(
+        self,
+        warehouse_id: str,
+        grid_width: int,
+        grid_height: int,
+        weight_col: str = 'quantity',
+        half_lives: Optional[Dict[str, float]] = None,
+        lateness_seconds: float = 300.0
+    ):
+        self.warehouse_id = str(warehouse_id)
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.half_lives = dict(half_lives or DEFAULT_HALF_LIVES)
+        self.heatmap = MovementHeatmap(grid_width, grid_height, weight_col=weight_col)
+        self.decayed = {name: np.zeros(grid_height * grid_width) for name in self.half_lives}
+        self.lateness_seconds = lateness_seconds
+        # Latest created_at folded in (UTC); the decayed grids are expressed as of this time
+        self.watermark: Optional[pd.Timestamp] = None
+        # Row key -> created_at (ns) of rows folded in within the lateness window of the watermark
+        self.recent_keys: Dict[int, int] = {}
+        self.late_rows = 0
+
+    def update(self, movements: MovementInput) -> int:
+        """
+        Fold movements not yet seen into every grid.
+
+        Rows are filtered against the watermark as it stood when the call
+        started (less the lateness margin), so the order of rows and chunks
+        does not matter. Rows older than the margin are dropped and counted
+        in ``late_rows``.
+
+        Args:
+            movements: DataFrame (or iterable of chunks) with columns
+                [from_x, from_y, to_x, to_y, <weight_col>, created_at] and optionally id
+
+        Returns:
+            Number of rows folded in
+        """
+        cutoff = self._since()
+        folded = 0
+        for chunk in iter_chunks(movements):
+            missing = {'created_at', self.heatmap.weight_col} - set(chunk.columns)
+            if missing:
+                raise ValueError(f"Movements need columns {sorted(missing)} to be accumulated")
+            if len(chunk) == 0:
+                continue
+
+            chunk = chunk.sort_values('created_at', kind='stable')
+            times = pd.to_datetime(chunk['created_at'], utc=True)
+            keys = self._row_keys(chunk)
+            fresh = ~keys.duplicated().to_numpy() & ~keys.isin(list(self.recent_keys)).to_numpy()
+            if cutoff is not None:
+                on_time = (times > cutoff).to_numpy()
+                self.late_rows += int((fresh & ~on_time).sum())
+                fresh &= on_time
+            chunk, times, keys = chunk[fresh], times[fresh], keys[fresh]
+            if len(chunk) == 0:
+                continue
+
+            self._advance(times.max())
+            age = (self.watermark - times).dt.total_seconds().to_numpy()
+            weights = chunk[self.heatmap.weight_col].to_numpy(dtype=np.float64)
+
+            self.heatmap.update(chunk)
+            for name, half_life in self.half_lives.items():
+                self.decayed[name] += self.heatmap.cell_counts(chunk, weights * 0.5 ** (age / half_life))
+            self.recent_keys.update(zip(keys.tolist(), times.dt.as_unit('ns').array.asi8.tolist()))
+            folded += len(chunk)
+
+        self._forget_old_keys()
+        return folded
+
+    def update_from_sql(self, con, chunksize: int = 100_000) -> int:
+        """
+        Pull new rows from the ``item_movements`` table and fold them in.
+
+        Rows without both endpoints are skipped.
+
+        Args:
+            con: SQLAlchemy engine or connection
+            chunksize: Rows fetched per round trip
+
+        Returns:
+            Number of rows folded in
+        """
+        from sqlalchemy import text
+
+        since = self._since()
+        since = since if since is not None else pd.Timestamp(0, tz='UTC')
+        chunks = pd.read_sql(
+            text(MOVEMENTS_QUERY),
+            con,
+            params={'warehouse_id': self.warehouse_id, 'since': since.to_pydatetime()},
+            chunksize=chunksize
+        )
+        return self.update(chunks)
+
+    def _since(self) -> Optional[pd.Timestamp]:
+        """Oldest created_at still accepted: the watermark less the lateness margin."""
+        if self.watermark is None:
+            return None
+        return self.watermark - pd.Timedelta(seconds=self.lateness_seconds)
+
+    def _row_keys(self, chunk: pd.DataFrame) -> pd.Series:
+        """Stable 64-bit identity per row: the hashed ``id`` column, else a hash of the movement itself."""
+        columns = ['id'] if 'id' in chunk.columns else ['from_x', 'from_y', 'to_x', 'to_y', self.heatmap.weight_col, 'created_at']
+        identity = chunk[columns].astype(str)
+        return pd.util.hash_pandas_object(identity, index=False).astype(np.int64).reset_index(drop=True).set_axis(chunk.index)
+
+    def _forget_old_keys(self):
+        """Drop keys of rows that are now older than the lateness margin; the cutoff filter covers them."""
+        since = self._since()
+        if since is None:
+            return
+        self.recent_keys = {key: ns for key, ns in self.recent_keys.items() if ns > since.value}
+
+    def _advance(self, until: pd.Timestamp):
+        """Decay the rolling grids forward so they are expressed as of ``until``."""
+        if self.watermark is not None:
+            if until <= self.watermark:
+                return
+            elapsed = (until - self.watermark).total_seconds()
+            for name, half_life in self.half_lives.items():
+                self.decayed[name] *= 0.5 ** (elapsed / half_life)
+        self.watermark = until
+
+    def grid(self, window: str, as_of: Optional[pd.Timestamp] = None) -> np.ndarray:
+        """
+        Return a time-decayed grid with shape (grid_height, grid_width).
+
+        Args:
+            window: One of the configured windows ('hourly', 'daily', 'weekly')
+            as_of: Time to decay to (defaults to the watermark)
+        """
+        values = self.decayed[window]
+        if as_of is not None and self.watermark is not None:
+            elapsed = max((_to_utc(as_of) - self.watermark).total_seconds(), 0.0)
+            values = values * 0.5 ** (elapsed / self.half_lives[window])
+        return values.reshape(self.grid_height, self.grid_width).copy()
+
+    def summary(self, top_n: int = 10, as_of: Optional[pd.Timestamp] = None) -> Dict:
+        """Return the all-time summary plus the rolling grids."""
+        result = self.heatmap.summary(top_n)
+        result['rolling'] = {name: self.grid(name, as_of) for name in self.half_lives}
+        result['watermark'] = self.watermark
+        return result
+
+    def save(self, path: str):
+        """Write a compressed snapshot of the accumulator state."""
+        heatmap = self.heatmap
+        off_grid = heatmap.off_grid
+        names = list(self.half_lives)
+        np.savez_compressed(
+            path,
+            warehouse_id=np.array(self.warehouse_id),
+            grid_shape=np.array([self.grid_height, self.grid_width]),
+            weight_col=np.array(heatmap.weight_col),
+            watermark=np.array(self.watermark.value if self.watermark is not None else -1, dtype=np.int64),
+            window_names=np.array(names),
+            half_lives=np.array([self.half_lives[name] for name in names]),
+            lateness_seconds=np.array(self.lateness_seconds),
+            recent_keys=np.array(list(self.recent_keys.items()), dtype=np.int64).reshape(-1, 2),
+            decayed=np.stack([self.decayed[name] for name in names]),
+            counts=heatmap.counts,
+            first_seen=heatmap.first_seen,
+            off_grid_cells=np.array(list(off_grid.keys()), dtype=np.int64).reshape(-1, 2),
+            off_grid_values=np.array(list(off_grid.values()), dtype=np.float64).reshape(-1, 2),
+            totals=np.array([heatmap.total_movements, heatmap.rows_seen, heatmap.integer_weights], dtype=np.float64)
+        )
+
+    @classmethod
+    def load(cls, path: str) -> 'HeatmapAccumulator':
+        """Restore an accumulator from a snapshot written by ``save``."""
+        with np.load(path) as snapshot:
+            height, width = snapshot['grid_shape'].tolist()
+            names = snapshot['window_names'].tolist()
+            acc = cls(
+                str(snapshot['warehouse_id']),
+                width,
+                height,
+                weight_col=str(snapshot['weight_col']),
+                half_lives=dict(zip(names, snapshot['half_lives'].tolist()))
+            )
+            if 'lateness_seconds' in snapshot:
+                acc.lateness_seconds = float(snapshot['lateness_seconds'])
+                acc.recent_keys = {int(key): int(ns) for key, ns in snapshot['recent_keys']}
+            watermark = int(snapshot['watermark'])
+            acc.watermark = pd.Timestamp(watermark, tz='UTC') if watermark >= 0 else None
+            acc.decayed = {name: grid.copy() for name, grid in zip(names, snapshot['decayed'])}
+
+            heatmap = acc.heatmap
+            heatmap.counts = snapshot['counts'].copy()
+            heatmap.first_seen = snapshot['first_seen'].copy()
+            heatmap.off_grid = {
+                (int(x), int(y)): [float(freq), int(pos)]
+                for (x, y), (freq, pos) in zip(snapshot['off_grid_cells'], snapshot['off_grid_values'])
+            }
+            total, rows_seen, integer_weights = snapshot['totals'].tolist()
+            heatmap.total_movements = total
+            heatmap.rows_seen = int(rows_seen)
+            heatmap.integer_weights = bool(integer_weights)
+        return acc
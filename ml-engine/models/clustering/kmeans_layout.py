@@ -3,135 +3,215 @@ Warehouse Layout Optimization using K-Means Clustering
 """
 import numpy as np
 import pandas as pd
-from sklearn.cluster import KMeans, DBSCAN
+from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from models.clustering.anomaly_index import SpatialAnomalyIndex
+from models.clustering.heatmap import MovementHeatmap, MovementInput
+from models.clustering.heatmap_accumulator import HeatmapAccumulator
+from models.clustering.picking_distance import PickingDistanceEvaluator
+from models.clustering.slotting import SlottingOptimizer
+from models.clustering.streaming_kmeans import StreamingKMeans
+
 
 class WarehouseLayoutOptimizer:
     """Optimize warehouse layout using clustering algorithms."""
     
-    def __init__(self, grid_width: int, grid_height: int):
+    def __init__(
+        self,
+        grid_width: int,
+        grid_height: int,
+        heatmap_accumulator: Optional[HeatmapAccumulator] = None,
+        distance_evaluator: Optional[PickingDistanceEvaluator] = None
+    ):
         self.grid_width = grid_width
         self.grid_height = grid_height
         self.scaler = StandardScaler()
+        self.heatmap_accumulator = heatmap_accumulator
+        self.distance_evaluator = distance_evaluator or PickingDistanceEvaluator(grid_width, grid_height)
+        self.streaming_kmeans = StreamingKMeans()
+        self.anomaly_index: Optional[SpatialAnomalyIndex] = None
     
-    def analyze_movement_patterns(self, movement_data: pd.DataFrame) -> Dict:
+    def analyze_movement_patterns(self, movement_data: MovementInput, top_n: int = 10) -> Dict:
         """
         Analyze item movement patterns to identify hotspots.
         
         Args:
-            movement_data: DataFrame with columns [item_id, from_x, from_y, to_x, to_y, frequency]
+            movement_data: DataFrame with columns [item_id, from_x, from_y, to_x, to_y, frequency],
+                or an iterable of such DataFrames (e.g. ``pd.read_csv(..., chunksize=...)``)
+            top_n: Number of hotspots to return
+        
+        When the optimizer has a heatmap accumulator, only rows newer than its
+        watermark are folded in (they must carry ``created_at``) and the result
+        covers all accumulated history, plus the rolling grids.
         
         Returns:
             Dictionary with analysis results
         """
-        # Calculate movement frequency for each location
-        location_freq = {}
-        
-        for _, row in movement_data.iterrows():
-            from_loc = (row['from_x'], row['from_y'])
-            to_loc = (row['to_x'], row['to_y'])
-            freq = row['frequency']
-            
-            location_freq[from_loc] = location_freq.get(from_loc, 0) + freq
-            location_freq[to_loc] = location_freq.get(to_loc, 0) + freq
+        if self.heatmap_accumulator is not None:
+            if movement_data is not None:
+                self.heatmap_accumulator.update(movement_data)
+            return self.heatmap_accumulator.summary(top_n)
         
-        # Create heatmap data
-        heatmap = np.zeros((self.grid_height, self.grid_width))
-        for (x, y), freq in location_freq.items():
-            if 0 <= x < self.grid_width and 0 <= y < self.grid_height:
-                heatmap[y, x] = freq
-        
-        return {
-            'heatmap': heatmap,
-            'hotspots': sorted(location_freq.items(), key=lambda x: x[1], reverse=True)[:10],
-            'total_movements': movement_data['frequency'].sum()
-        }
+        heatmap = MovementHeatmap(self.grid_width, self.grid_height)
+        heatmap.update_many(movement_data)
+        return heatmap.summary(top_n)
     
-    def cluster_items(self, item_data: pd.DataFrame, n_clusters: int = 5) -> Dict:
+    def cluster_items(
+        self,
+        item_data: pd.DataFrame,
+        n_clusters: Union[int, str] = 5,
+        method: str = 'kmeans'
+    ) -> Dict:
         """
         Cluster items based on movement patterns and characteristics.
         
         Args:
             item_data: DataFrame with columns [item_id, x, y, movement_freq, category_encoded]
-            n_clusters: Number of clusters
+            n_clusters: Number of clusters, or 'auto' to choose one (uses the minibatch mode)
+            method: 'kmeans' for full K-Means, or 'minibatch' to stream items in chunks
+                through Mini-Batch K-Means, warm-started from the previous run's centroids
         
         Returns:
             Dictionary with clustering results
         """
         # Prepare features
         features = item_data[['x', 'y', 'movement_freq', 'category_encoded']].values
-        features_scaled = self.scaler.fit_transform(features)
+        result = {}
         
-        # Apply K-Means clustering
-        kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
-        clusters = kmeans.fit_predict(features_scaled)
+        if method == 'minibatch' or n_clusters == 'auto':
+            fitted = self.streaming_kmeans.fit_predict(features, n_clusters)
+            self.scaler = self.streaming_kmeans.scaler
+            clusters = fitted['labels']
+            n_clusters = fitted['n_clusters']
+            inertia = fitted['inertia']
+            if 'inertia_curve' in fitted:
+                result['inertia_curve'] = fitted['inertia_curve']
+        elif method == 'kmeans':
+            features_scaled = self.scaler.fit_transform(features)
+            
+            # Apply K-Means clustering
+            kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
+            clusters = kmeans.fit_predict(features_scaled)
+            inertia = kmeans.inertia_
+        else:
+            raise ValueError(f"Unknown clustering method '{method}'")
         
         item_data['cluster'] = clusters
         
-        # Calculate cluster statistics
-        cluster_stats = []
-        for i in range(n_clusters):
-            cluster_items = item_data[item_data['cluster'] == i]
-            stats = {
-                'cluster_id': i,
-                'item_count': len(cluster_items),
-                'avg_movement_freq': cluster_items['movement_freq'].mean(),
-                'center_x': cluster_items['x'].mean(),
-                'center_y': cluster_items['y'].mean()
-            }
-            cluster_stats.append(stats)
-        
-        return {
+        result.update({
             'clusters': clusters,
-            'cluster_stats': cluster_stats,
+            'cluster_stats': self._cluster_stats(item_data, clusters, n_clusters),
             'item_data': item_data,
-            'inertia': kmeans.inertia_
+            'inertia': inertia
+        })
+        return result
+    
+    def _cluster_stats(self, item_data: pd.DataFrame, clusters: np.ndarray, n_clusters: int) -> List[Dict]:
+        """Per-cluster statistics computed in one grouped pass."""
+        counts = np.bincount(clusters, minlength=n_clusters)
+        sums = {
+            col: np.bincount(clusters, weights=item_data[col].to_numpy(dtype=np.float64), minlength=n_clusters)
+            for col in ('movement_freq', 'x', 'y')
         }
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = {col: total / counts for col, total in sums.items()}
+        
+        return [
+            {
+                'cluster_id': i,
+                'item_count': int(counts[i]),
+                'avg_movement_freq': means['movement_freq'][i],
+                'center_x': means['x'][i],
+                'center_y': means['y'][i]
+            }
+            for i in range(n_clusters)
+        ]
     
-    def detect_anomalies(self, item_data: pd.DataFrame, eps: float = 0.5, min_samples: int = 5) -> Dict:
+    def detect_anomalies(
+        self,
+        item_data: pd.DataFrame,
+        eps: float = 0.5,
+        min_samples: int = 5,
+        zones: Optional[List[Dict]] = None
+    ) -> Dict:
         """
-        Detect anomalous item placements using DBSCAN.
+        Detect anomalous item placements (DBSCAN noise points).
+        
+        Builds ``self.anomaly_index``, a spatial index with its own scaler, so
+        later placements can be checked incrementally with ``check_placement``.
         
         Args:
             item_data: DataFrame with item locations and features
             eps: DBSCAN epsilon parameter
             min_samples: DBSCAN min_samples parameter
+            zones: Optional warehouse zones (zone_name, x_start, y_start, x_end, y_end)
+                to break results down by
         
         Returns:
             Dictionary with anomaly detection results
         """
-        features = item_data[['x', 'y', 'movement_freq']].values
-        features_scaled = self.scaler.fit_transform(features)
+        self.anomaly_index = SpatialAnomalyIndex(eps=eps, min_samples=min_samples).build(item_data)
         
-        dbscan = DBSCAN(eps=eps, min_samples=min_samples)
-        labels = dbscan.fit_predict(features_scaled)
+        # Identify anomalies (DBSCAN label = -1)
+        anomalies = item_data[self.anomaly_index.anomaly_mask()[:len(item_data)]]
         
-        # Identify anomalies (label = -1)
-        anomalies = item_data[labels == -1]
-        
-        return {
+        result = {
             'anomalies': anomalies,
             'anomaly_count': len(anomalies),
             'normal_count': len(item_data) - len(anomalies)
         }
+        if zones is not None:
+            result['zones'] = self.anomaly_index.zone_summary(zones)
+        return result
+    
+    def check_placement(self, item_id, x: int, y: int, movement_freq: float) -> Dict:
+        """
+        Insert or move one item in the anomaly index and flag it.
+        
+        Requires a prior ``detect_anomalies`` call to build the index.
+        """
+        if self.anomaly_index is None:
+            raise RuntimeError("Call detect_anomalies before checking placements")
+        return self.anomaly_index.upsert(item_id, (x, y, movement_freq))
     
-    def optimize_layout(self, current_layout: pd.DataFrame, movement_data: pd.DataFrame) -> Dict:
+    def optimize_layout(
+        self,
+        current_layout: pd.DataFrame,
+        movement_data: pd.DataFrame,
+        algorithm: str = 'simulated_annealing',
+        time_budget: Optional[float] = None,
+        restarts: int = 4,
+        max_recommendations: int = 20
+    ) -> Dict:
         """
         Generate optimized layout recommendations.
         
         Args:
             current_layout: Current item positions
             movement_data: Historical movement data
+            algorithm: Slotting search, 'simulated_annealing' or 'genetic'
+            time_budget: Wall-clock cap in seconds for the slotting search
+                (defaults to one that grows with the number of items)
+            restarts: Independent slotting searches, spread over a process pool for large layouts
+            max_recommendations: Maximum number of relocations to return
         
         Returns:
             Dictionary with optimization recommendations
         """
         # Analyze current performance
-        movement_analysis = self.analyze_movement_patterns(movement_data)
+        accumulator = self.heatmap_accumulator
+        if accumulator is not None:
+            # Only timestamped rows in the accumulator's weight column can be folded in;
+            # an aggregated [item_id, ..., frequency] frame is summarized from the accumulated history
+            if {'created_at', accumulator.heatmap.weight_col} <= set(movement_data.columns):
+                accumulator.update(movement_data)
+            movement_analysis = accumulator.summary()
+        else:
+            movement_analysis = self.analyze_movement_patterns(movement_data)
         
         # Cluster items
         clustering_result = self.cluster_items(current_layout, n_clusters=5)
@@ -139,26 +219,47 @@ class WarehouseLayoutOptimizer:
         # Calculate current average picking time (simplified)
         current_avg_distance = self._calculate_avg_picking_distance(current_layout, movement_data)
         
-        # Generate recommendations: move high-frequency items closer to shipping zone
-        recommendations = []
-        high_freq_items = current_layout.nlargest(20, 'movement_freq')
+        # Search item-to-slot assignments that bring busy items closer to the depot
+        frequencies = current_layout['movement_freq'].to_numpy(dtype=np.float64)
+        current_xy = current_layout[['x', 'y']].to_numpy()
+        slotting = SlottingOptimizer(self.distance_evaluator).optimize(
+            frequencies,
+            current_xy,
+            algorithm=algorithm,
+            time_budget=time_budget,
+            restarts=restarts
+        )
         
-        for _, item in high_freq_items.iterrows():
-            # Recommend moving to zone closer to (0, 0) - assuming shipping zone
-            recommended_x = min(item['x'], self.grid_width // 4)
-            recommended_y = min(item['y'], self.grid_height // 4)
-            
-            if recommended_x != item['x'] or recommended_y != item['y']:
-                recommendations.append({
-                    'item_id': item['item_id'],
-                    'current_location': (item['x'], item['y']),
-                    'recommended_location': (recommended_x, recommended_y),
-                    'expected_improvement': self._estimate_improvement(item, recommended_x, recommended_y)
-                })
+        # Recommend the relocations that save the most frequency-weighted distance
+        moved = slotting['moved_items']
+        new_xy = slotting['locations'][moved]
+        old_xy = current_xy[moved]
+        savings = frequencies[moved] * (
+            self.distance_evaluator.location_distances(old_xy) - self.distance_evaluator.location_distances(new_xy)
+        )
+        top = np.argsort(-savings, kind='stable')[:max_recommendations]
+        improvements = self._estimate_improvement(old_xy[top], new_xy[top])
         
-        # Estimate new average picking time
-        estimated_new_distance = current_avg_distance * 0.7  # Simplified estimation
-        improvement = ((current_avg_distance - estimated_new_distance) / current_avg_distance) * 100
+        recommendations = [
+            {
+                'item_id': item_id,
+                'current_location': tuple(current),
+                'recommended_location': tuple(recommended),
+                'expected_improvement': improvement
+            }
+            for item_id, current, recommended, improvement in zip(
+                current_layout['item_id'].to_numpy()[moved][top].tolist(),
+                old_xy[top].tolist(),
+                new_xy[top].tolist(),
+                improvements.tolist()
+            )
+        ]
+        
+        # Scale the observed average by the measured reduction in weighted depot distance
+        before, after = slotting['avg_distance_before'], slotting['avg_distance_after']
+        ratio = after / before if before > 0 else 1.0
+        estimated_new_distance = current_avg_distance * ratio
+        improvement = (1 - ratio) * 100
         
         return {
             'current_avg_picking_distance': current_avg_distance,
@@ -166,26 +267,20 @@ class WarehouseLayoutOptimizer:
             'improvement_percentage': improvement,
             'recommendations': recommendations,
             'heatmap': movement_analysis['heatmap'],
-            'clustering': clustering_result
+            'clustering': clustering_result,
+            'slotting': slotting
         }
     
-    def _calculate_avg_picking_distance(self, layout: pd.DataFrame, movements: pd.DataFrame) -> float:
+    def _calculate_avg_picking_distance(self, layout: pd.DataFrame, movements: MovementInput) -> float:
         """Calculate average picking distance."""
-        total_distance = 0
-        total_picks = 0
-        
-        for _, move in movements.iterrows():
-            distance = abs(move['to_x'] - move['from_x']) + abs(move['to_y'] - move['from_y'])
-            total_distance += distance * move['frequency']
-            total_picks += move['frequency']
-        
-        return total_distance / total_picks if total_picks > 0 else 0
+        return self.distance_evaluator.average_movement_distance(movements)
     
-    def _estimate_improvement(self, item: pd.Series, new_x: int, new_y: int) -> float:
-        """Estimate improvement from relocating an item."""
-        current_distance = abs(item['x']) + abs(item['y'])
-        new_distance = abs(new_x) + abs(new_y)
-        return ((current_distance - new_distance) / current_distance) * 100 if current_distance > 0 else 0
+    def _estimate_improvement(self, current_xy: np.ndarray, new_xy: np.ndarray) -> np.ndarray:
+        """Estimate percentage improvement in depot distance from relocating items, one row per item."""
+        current_distance = np.asarray(self.distance_evaluator.location_distances(current_xy), dtype=np.float64)
+        new_distance = self.distance_evaluator.location_distances(new_xy)
+        safe = np.where(current_distance > 0, current_distance, 1.0)
+        return np.where(current_distance > 0, (current_distance - new_distance) / safe * 100, 0.0)
     
     def visualize_heatmap(self, heatmap: np.ndarray, save_path: str = None):
         """Visualize movement heatmap."""
@@ -0,0 +1,142 @@
+"""
+Vectorized picking-distance evaluation for warehouse layouts
+"""
+import numpy as np
+from typing import Iterable, Optional, Tuple
+
+from models.clustering.heatmap import MovementInput, iter_chunks
+from models.optimization.distance_oracle import GridDistanceOracle
+
+
+class PickingDistanceEvaluator:
+    """
+    Score layouts and movement histories with array operations.
+
+    Supported metrics:
+        manhattan: |dx| + |dy|
+        aisle: items are stored in vertical aisles of ``aisle_width`` columns;
+            changing aisle means walking to the front (y = 0) or back
+            (y = grid_height - 1) cross-aisle, whichever is shorter
+        obstacle: shortest 4-connected path on the grid avoiding obstacle cells;
+            unreachable cells are ``GridDistanceOracle.UNREACHABLE`` away
+    """
+
+    METRICS = ('manhattan', 'aisle', 'obstacle')
+
+    def __init__(
+        self,
+        grid_width: int,
+        grid_height: int,
+        metric: str = 'manhattan',
+        depot: Tuple[int, int] = (0, 0),
+        aisle_width: int = 2,
+        obstacles: Optional[Iterable[Tuple[int, int]]] = None
+    ):
+        if metric not in self.METRICS:
+            raise ValueError(f"Unknown metric '{metric}', expected one of {self.METRICS}")
+
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.metric = metric
+        self.depot = depot
+        self.aisle_width = aisle_width
+        self.obstacles = set(obstacles or ())
+        self._oracle = None
+        self._depot_table = None
+
+    def pair_distances(self, from_xy: np.ndarray, to_xy: np.ndarray) -> np.ndarray:
+        """
+        Distance between matching rows of two coordinate arrays.
+
+        Args:
+            from_xy: Array of shape (..., 2)
+            to_xy: Array broadcastable to from_xy
+
+        Returns:
+            Array of distances with the broadcast shape minus the last axis
+        """
+        from_xy = np.asarray(from_xy, dtype=np.int64)
+        to_xy = np.asarray(to_xy, dtype=np.int64)
+
+        if self.metric == 'obstacle':
+            from_xy, to_xy = np.broadcast_arrays(from_xy, to_xy)
+            distances = self.oracle().pair_distances(from_xy.reshape(-1, 2), to_xy.reshape(-1, 2))
+            return distances.reshape(from_xy.shape[:-1])
+
+        dx = np.abs(from_xy[..., 0] - to_xy[..., 0])
+        dy = np.abs(from_xy[..., 1] - to_xy[..., 1])
+        if self.metric == 'manhattan':
+            return dx + dy
+
+        same_aisle = (from_xy[..., 0] // self.aisle_width) == (to_xy[..., 0] // self.aisle_width)
+        y_sum = from_xy[..., 1] + to_xy[..., 1]
+        around = np.minimum(y_sum, 2 * (self.grid_height - 1) - y_sum)
+        return dx + np.where(same_aisle, dy, around)
+
+    def depot_table(self) -> np.ndarray:
+        """Distance from the depot to every cell, flattened row-major (y * width + x)."""
+        if self._depot_table is None:
+            if self.metric == 'obstacle':
+                # Walking distances are symmetric, so one BFS from the depot covers every cell
+                oracle = self.oracle()
+                self._depot_table = oracle.distances_from(oracle.cells([self.depot]))[0].astype(np.float64)
+            else:
+                ys, xs = np.divmod(np.arange(self.grid_width * self.grid_height), self.grid_width)
+                self._depot_table = self.pair_distances(np.column_stack((xs, ys)), np.asarray(self.depot)).astype(np.float64)
+        return self._depot_table
+
+    def location_distances(self, locations: np.ndarray) -> np.ndarray:
+        """Distance from the depot for locations of shape (..., 2)."""
+        locations = np.asarray(locations, dtype=np.int64)
+        if self.metric != 'obstacle':
+            return self.pair_distances(locations, np.asarray(self.depot))
+        return self.depot_table()[self.oracle().cells(locations).reshape(locations.shape[:-1])]
+
+    def layout_cost(self, frequencies: np.ndarray, locations: np.ndarray) -> np.ndarray:
+        """
+        Frequency-weighted depot distance of one or many layouts.
+
+        Args:
+            frequencies: Pick frequency per item, shape (n,)
+            locations: Item locations, shape (n, 2) or (k, n, 2) for k candidate layouts
+
+        Returns:
+            Scalar cost for one layout, or an array of k costs
+        """
+        return self.location_distances(locations) @ np.asarray(frequencies, dtype=np.float64)
+
+    def average_layout_distance(self, frequencies: np.ndarray, locations: np.ndarray) -> np.ndarray:
+        """Average depot distance per pick for one or many layouts."""
+        total = np.asarray(frequencies, dtype=np.float64).sum()
+        cost = self.layout_cost(frequencies, locations)
+        return cost / total if total > 0 else np.zeros_like(cost)
+
+    def average_movement_distance(self, movements: MovementInput, weight_col: str = 'frequency') -> float:
+        """
+        Frequency-weighted average distance of recorded movements.
+
+        Args:
+            movements: DataFrame (or iterable of chunks) with columns
+                [from_x, from_y, to_x, to_y, <weight_col>]
+            weight_col: Column holding the movement frequency
+
+        Returns:
+            Average distance per movement
+        """
+        total_distance = 0.0
+        total_picks = 0.0
+
+        for chunk in iter_chunks(movements):
+            from_xy = chunk[['from_x', 'from_y']].to_numpy()
+            to_xy = chunk[['to_x', 'to_y']].to_numpy()
+            weights = chunk[weight_col].to_numpy(dtype=np.float64)
+            total_distance += self.pair_distances(from_xy, to_xy) @ weights
+            total_picks += weights.sum()
+
+        return total_distance / total_picks if total_picks > 0 else 0
+
+    def oracle(self) -> GridDistanceOracle:
+        """Shortest-path oracle backing the obstacle metric."""
+        if self._oracle is None:
+            self._oracle = GridDistanceOracle(self.grid_width, self.grid_height, self.obstacles)
+        return self._oracle
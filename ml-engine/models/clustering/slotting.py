@@ -0,0 +1,380 @@
+"""
+Slotting optimization: search item-to-location assignments with
+simulated annealing or a genetic algorithm
+"""
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+from models.clustering.picking_distance import PickingDistanceEvaluator
+
+
+ALGORITHMS = ('simulated_annealing', 'genetic')
+
+# Below this many items, restarts run in-process; a pool costs more to start than it saves
+PARALLEL_MIN_ITEMS = 5000
+
+
+def default_time_budget(n_items: int) -> float:
+    """Wall-clock cap for a search over ``n_items``: one second plus one per thousand items, at most ten."""
+    return float(min(10.0, 1.0 + n_items / 1000))
+
+
+class SlottingProblem:
+    """
+    Item-to-slot assignment with an O(1) swap delta.
+
+    An assignment is a permutation ``perm`` over all slots: positions
+    ``0..n_items-1`` hold items, the remaining positions are empty slots.
+    The cost of putting item ``i`` in slot ``s`` is::
+
+        frequency[i] * depot_distance[s] + relocation_weight * |origin[i] - s|_1
+
+    so the search trades shorter picks against the labour of moving stock.
+    """
+
+    def __init__(
+        self,
+        frequencies: np.ndarray,
+        origins: np.ndarray,
+        slot_xy: np.ndarray,
+        slot_distance: np.ndarray,
+        relocation_weight: float
+    ):
+        self.n_items = len(frequencies)
+        self.n_slots = len(slot_xy)
+        padding = self.n_slots - self.n_items
+
+        # Empty positions have zero frequency and no relocation cost
+        self.freq = np.concatenate((frequencies, np.zeros(padding)))
+        self.move_weight = np.concatenate((np.full(self.n_items, relocation_weight), np.zeros(padding)))
+        self.origin_x = np.concatenate((origins[:, 0], np.zeros(padding))).astype(np.float64)
+        self.origin_y = np.concatenate((origins[:, 1], np.zeros(padding))).astype(np.float64)
+        self.slot_x = slot_xy[:, 0].astype(np.float64)
+        self.slot_y = slot_xy[:, 1].astype(np.float64)
+        self.slot_distance = slot_distance
+
+    def cost(self, positions: np.ndarray, slots: np.ndarray) -> np.ndarray:
+        """Cost of placing each position in the matching slot."""
+        relocation = np.abs(self.origin_x[positions] - self.slot_x[slots]) + np.abs(self.origin_y[positions] - self.slot_y[slots])
+        return self.freq[positions] * self.slot_distance[slots] + self.move_weight[positions] * relocation
+
+    def total(self, perm: np.ndarray) -> np.ndarray:
+        """Total cost of one assignment (m,) or a population of assignments (k, m)."""
+        positions = np.broadcast_to(np.arange(self.n_slots), perm.shape)
+        return self.cost(positions, perm).sum(axis=-1)
+
+    def swap_delta(self, perm: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        """Cost change of swapping the slots of positions a and b (elementwise)."""
+        sa, sb = perm[a], perm[b]
+        return self.cost(a, sb) + self.cost(b, sa) - self.cost(a, sa) - self.cost(b, sb)
+
+    def propose(self, rng: np.random.Generator, batch: int):
+        """Draw a batch of non-overlapping swaps; the first position is always an item."""
+        a = rng.integers(0, self.n_items, batch)
+        b = rng.integers(0, self.n_slots, batch)
+        # Swaps that share a position would not commute, keep only disjoint ones
+        both = np.concatenate((a, b))
+        _, first, counts = np.unique(both, return_index=True, return_counts=True)
+        unique_once = np.zeros(len(both), dtype=bool)
+        unique_once[first[counts == 1]] = True
+        keep = unique_once[:batch] & unique_once[batch:]
+        return a[keep], b[keep]
+
+    def greedy(self) -> np.ndarray:
+        """Busiest items to the closest slots, ignoring relocation cost."""
+        perm = np.empty(self.n_slots, dtype=np.int64)
+        perm[np.argsort(-self.freq, kind='stable')] = np.argsort(self.slot_distance, kind='stable')
+        return perm
+
+
+def _batch_size(problem: SlottingProblem) -> int:
+    return int(max(1, min(1024, problem.n_items // 8)))
+
+
+def _descend(problem: SlottingProblem, perm: np.ndarray, rng: np.random.Generator, rounds: int) -> float:
+    """Apply only improving swaps for a fixed number of batches; returns the cost change."""
+    change = 0.0
+    batch = _batch_size(problem)
+    for _ in range(rounds):
+        a, b = problem.propose(rng, batch)
+        delta = problem.swap_delta(perm, a, b)
+        accept = delta < 0
+        a, b = a[accept], b[accept]
+        perm[a], perm[b] = perm[b], perm[a]
+        change += delta[accept].sum()
+    return change
+
+
+def simulated_annealing(
+    problem: SlottingProblem,
+    perm: np.ndarray,
+    time_budget: float,
+    seed: int,
+    final_temperature_ratio: float = 1e-4,
+    sweeps: int = 200,
+    patience: float = 0.1
+) -> Dict:
+    """
+    Anneal from ``perm`` over ``sweeps`` proposals per item, or until the time budget runs out.
+
+    Each step proposes a batch of disjoint swaps, evaluates their deltas in
+    one vectorized call and applies the Metropolis rule to all of them. The
+    temperature follows whichever of the iteration schedule and the clock is
+    further along. Once in the colder half of the schedule, the search stops
+    when the best cost has not improved for ``patience`` of the schedule.
+    """
+    rng = np.random.default_rng(seed)
+    batch = _batch_size(problem)
+    perm = perm.copy()
+    current = float(problem.total(perm))
+    best, best_perm = current, perm.copy()
+
+    # Start hot enough to accept a typical uphill swap ~30% of the time
+    a, b = problem.propose(rng, batch)
+    uphill = problem.swap_delta(perm, a, b)
+    uphill = uphill[uphill > 0]
+    t_start = float(uphill.mean() / -np.log(0.3)) if len(uphill) else 1.0
+    t_end = t_start * final_temperature_ratio
+
+    max_iterations = max(1, int(sweeps * problem.n_items / batch))
+    stall_limit = max(1, int(patience * max_iterations))
+    started = time.perf_counter()
+    iterations = last_improvement = 0
+    while True:
+        elapsed = (time.perf_counter() - started) / time_budget if time_budget > 0 else 1.0
+        progress = max(elapsed, iterations / max_iterations)
+        if progress >= 1.0 or (progress >= 0.5 and iterations - last_improvement > stall_limit):
+            break
+        temperature = t_start * (t_end / t_start) ** progress
+
+        a, b = problem.propose(rng, batch)
+        delta = problem.swap_delta(perm, a, b)
+        accept = (delta < 0) | (rng.random(len(delta)) < np.exp(-np.maximum(delta, 0) / temperature))
+        a, b = a[accept], b[accept]
+        perm[a], perm[b] = perm[b], perm[a]
+        current += delta[accept].sum()
+        iterations += 1
+
+        if current < best - 1e-9:
+            best = current
+            best_perm[:] = perm
+            last_improvement = iterations
+
+    return {'perm': best_perm, 'cost': float(problem.total(best_perm)), 'iterations': iterations}
+
+
+def genetic(
+    problem: SlottingProblem,
+    perm: np.ndarray,
+    time_budget: float,
+    seed: int,
+    population_size: int = 12,
+    elite: int = 2,
+    descent_rounds: int = 20,
+    patience: int = 10
+) -> Dict:
+    """
+    Evolve a population of assignments until the time budget runs out or
+    the best cost has not improved for ``patience`` generations.
+
+    Children inherit a random half of one parent's item slots and fill the
+    rest in the other parent's order; each child is then polished with a few
+    rounds of improving swaps.
+    """
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    n, m = problem.n_items, problem.n_slots
+
+    population = np.empty((population_size, m), dtype=np.int64)
+    population[0] = perm
+    population[1 % population_size] = problem.greedy()
+    for k in range(2, population_size):
+        individual = population[k % 2].copy()
+        a, b = problem.propose(rng, max(1, n // 20))
+        individual[a], individual[b] = individual[b], individual[a]
+        _descend(problem, individual, rng, descent_rounds)
+        population[k] = individual
+    fitness = problem.total(population)
+
+    generations = stalled = 0
+    while time.perf_counter() - started < time_budget and stalled < patience:
+        previous_best = fitness.min()
+        order = np.argsort(fitness)
+        children = [population[i].copy() for i in order[:elite]]
+
+        while len(children) < population_size:
+            contenders = rng.integers(0, population_size, (2, 2))
+            first = contenders[0][np.argmin(fitness[contenders[0]])]
+            second = contenders[1][np.argmin(fitness[contenders[1]])]
+            child = _crossover(population[first], population[second], n, rng)
+            _descend(problem, child, rng, descent_rounds)
+            children.append(child)
+
+        population = np.stack(children)
+        fitness = problem.total(population)
+        generations += 1
+        stalled = stalled + 1 if fitness.min() >= previous_best - 1e-9 else 0
+
+    best = int(np.argmin(fitness))
+    return {'perm': population[best], 'cost': float(fitness[best]), 'iterations': generations}
+
+
+def _crossover(parent_a: np.ndarray, parent_b: np.ndarray, n_items: int, rng: np.random.Generator) -> np.ndarray:
+    """Uniform crossover that keeps the child a valid permutation of slots."""
+    m = len(parent_a)
+    child = np.full(m, -1, dtype=np.int64)
+    used = np.zeros(m, dtype=bool)
+
+    inherit = rng.random(n_items) < 0.5
+    child[:n_items][inherit] = parent_a[:n_items][inherit]
+    used[child[:n_items][inherit]] = True
+
+    open_items = np.flatnonzero(~inherit)
+    from_b = parent_b[open_items]
+    free = ~used[from_b]
+    child[open_items[free]] = from_b[free]
+    used[from_b[free]] = True
+
+    # Remaining item positions and the empty tail take unused slots in parent B's order
+    leftover = parent_b[~used[parent_b]]
+    holes = np.flatnonzero(child == -1)
+    child[holes] = leftover
+    return child
+
+
+def _run_restart(args) -> Dict:
+    problem, perm, algorithm, time_budget, seed = args
+    search = simulated_annealing if algorithm == 'simulated_annealing' else genetic
+    return search(problem, perm, time_budget, seed)
+
+
+class SlottingOptimizer:
+    """Search item-to-location assignments that shorten frequency-weighted picking distance."""
+
+    def __init__(
+        self,
+        evaluator: PickingDistanceEvaluator,
+        relocation_weight: float = 1.0,
+        slots: Optional[np.ndarray] = None
+    ):
+        """
+        Args:
+            evaluator: Distance evaluator defining the grid, depot and metric
+            relocation_weight: Cost per cell of moving one item away from its current slot
+            slots: Candidate (x, y) slots; defaults to every cell of the grid
+        """
+        self.evaluator = evaluator
+        self.relocation_weight = relocation_weight
+        if slots is None:
+            ys, xs = np.divmod(np.arange(evaluator.grid_width * evaluator.grid_height), evaluator.grid_width)
+            slots = np.column_stack((xs, ys))
+        self.slots = np.asarray(slots, dtype=np.int64)
+
+    def optimize(
+        self,
+        frequencies: np.ndarray,
+        locations: np.ndarray,
+        algorithm: str = 'simulated_annealing',
+        time_budget: Optional[float] = None,
+        restarts: int = 4,
+        n_jobs: Optional[int] = None,
+        seed: int = 42
+    ) -> Dict:
+        """
+        Find a better assignment of items to slots.
+
+        Args:
+            frequencies: Pick frequency per item, shape (n,)
+            locations: Current (x, y) per item, shape (n, 2)
+            algorithm: 'simulated_annealing' or 'genetic'
+            time_budget: Wall-clock cap in seconds for the whole search, shared by
+                restarts that run in successive waves of ``n_jobs``; defaults
+                to ``default_time_budget(n_items)``. Searches usually stop
+                earlier, once they stall.
+            restarts: Independent searches; the best one wins
+            n_jobs: Worker processes (defaults to min(restarts, CPU count) from
+                ``PARALLEL_MIN_ITEMS`` items up, and to 1 below)
+            seed: Base random seed
+
+        Returns:
+            Dictionary with the new locations and measured before/after distances
+        """
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown algorithm '{algorithm}', expected one of {ALGORITHMS}")
+
+        frequencies = np.asarray(frequencies, dtype=np.float64)
+        locations = np.asarray(locations, dtype=np.int64)
+        if len(frequencies) > len(self.slots):
+            raise ValueError(f"{len(frequencies)} items do not fit in {len(self.slots)} slots")
+
+        started = time.perf_counter()
+        slot_distance = np.asarray(self.evaluator.location_distances(self.slots), dtype=np.float64)
+        problem = SlottingProblem(frequencies, locations, self.slots, slot_distance, self.relocation_weight)
+        initial = self._initial_assignment(locations)
+
+        if time_budget is None:
+            time_budget = default_time_budget(len(frequencies))
+        if n_jobs is None:
+            n_jobs = (os.cpu_count() or 1) if len(frequencies) >= PARALLEL_MIN_ITEMS else 1
+        n_jobs = max(1, min(n_jobs, restarts))
+        waves = -(-restarts // n_jobs)
+        budget = max(time_budget - (time.perf_counter() - started), 0.0) / waves
+
+        seeds = [initial, problem.greedy()]
+        tasks = [(problem, seeds[r % 2], algorithm, budget, seed + r) for r in range(restarts)]
+        if n_jobs > 1:
+            with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+                runs = list(pool.map(_run_restart, tasks))
+        else:
+            runs = [_run_restart(task) for task in tasks]
+
+        best = min(runs, key=lambda run: run['cost'])
+        new_locations = self.slots[best['perm'][:problem.n_items]]
+        moved = np.flatnonzero((new_locations != locations).any(axis=1))
+
+        return {
+            'algorithm': algorithm,
+            'locations': new_locations,
+            'moved_items': moved,
+            'avg_distance_before': float(self.evaluator.average_layout_distance(frequencies, locations)),
+            'avg_distance_after': float(self.evaluator.average_layout_distance(frequencies, new_locations)),
+            'relocation_distance': float(np.abs(new_locations - locations).sum()),
+            'objective_before': float(problem.total(initial)),
+            'objective_after': best['cost'],
+            'iterations': int(sum(run['iterations'] for run in runs)),
+            'restarts': restarts,
+            'elapsed_seconds': time.perf_counter() - started
+        }
+
+    def _initial_assignment(self, locations: np.ndarray) -> np.ndarray:
+        """
+        Permutation that keeps every item in its current slot.
+
+        Items sharing a slot (or sitting outside the candidate slots) are given
+        the free slots that remain, in slot order.
+        """
+        n_slots = len(self.slots)
+        width = int(max(self.slots[:, 0].max(), locations[:, 0].max())) + 1
+        slot_keys = self.slots[:, 1] * width + self.slots[:, 0]
+        item_keys = locations[:, 1] * width + locations[:, 0]
+
+        key_order = np.argsort(slot_keys)
+        pos = np.searchsorted(slot_keys[key_order], item_keys)
+        pos = np.minimum(pos, n_slots - 1)
+        slot_of_item = key_order[pos]
+        found = slot_keys[slot_of_item] == item_keys
+
+        perm = np.full(n_slots, -1, dtype=np.int64)
+        taken = np.zeros(n_slots, dtype=bool)
+        claimants = np.flatnonzero(found)
+        _, first = np.unique(slot_of_item[claimants], return_index=True)
+        keepers = claimants[first]
+        perm[keepers] = slot_of_item[keepers]
+        taken[slot_of_item[keepers]] = True
+
+        holes = np.flatnonzero(perm == -1)
+        perm[holes] = np.flatnonzero(~taken)
+        return perm
@@ -0,0 +1,160 @@
+"""
+Chunked Mini-Batch K-Means with warm starts and automatic cluster count
+"""
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.preprocessing import StandardScaler
+from typing import Dict, Optional, Tuple, Union
+
+
+def ward_merge_path(centroids: np.ndarray, counts: np.ndarray, k_min: int) -> Dict[int, Tuple[np.ndarray, float]]:
+    """
+    Greedily merge weighted centroids with Ward's criterion.
+
+    Merging clusters a and b with fixed assignments raises the within-cluster
+    sum of squares by exactly ``n_a * n_b / (n_a + n_b) * ||c_a - c_b||^2``, so
+    one pass over the k_max centroids yields a solution and an inertia
+    increase for every smaller k without revisiting the data.
+
+    Returns:
+        Mapping k -> (centroids, inertia increase relative to k_max)
+    """
+    centroids = centroids.astype(np.float64).copy()
+    counts = counts.astype(np.float64).copy()
+    alive = counts > 0
+    increase = 0.0
+    path = {int(alive.sum()): (centroids[alive].copy(), increase)}
+
+    while alive.sum() > max(k_min, 1):
+        idx = np.flatnonzero(alive)
+        c, n = centroids[idx], counts[idx]
+        sq = ((c[:, None, :] - c[None, :, :]) ** 2).sum(axis=-1)
+        cost = (n[:, None] * n[None, :]) / (n[:, None] + n[None, :]) * sq
+        np.fill_diagonal(cost, np.inf)
+        i, j = np.unravel_index(np.argmin(cost), cost.shape)
+        a, b = idx[i], idx[j]
+
+        increase += cost[i, j]
+        total = counts[a] + counts[b]
+        centroids[a] = (centroids[a] * counts[a] + centroids[b] * counts[b]) / total
+        counts[a] = total
+        alive[b] = False
+        path[int(alive.sum())] = (centroids[alive].copy(), increase)
+
+    return path
+
+
+def elbow(ks: np.ndarray, inertias: np.ndarray) -> int:
+    """Pick the k whose inertia lies furthest below the chord between the curve's endpoints."""
+    if len(ks) < 3:
+        return int(ks[0])
+    x = (ks - ks[0]) / (ks[-1] - ks[0])
+    span = inertias[0] - inertias[-1]
+    y = (inertias - inertias[-1]) / span if span > 0 else np.zeros_like(inertias)
+    # Chord runs from (0, 1) to (1, 0); its height at x is 1 - x
+    return int(ks[np.argmax((1 - x) - y)])
+
+
+class StreamingKMeans:
+    """
+    Cluster large feature tables chunk by chunk.
+
+    Features are standardized with an incrementally fitted scaler, centroids
+    are learned with ``MiniBatchKMeans.partial_fit`` and the previous run's
+    centroids (kept in raw feature space) seed the next run when the cluster
+    count matches.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 10_000,
+        batch_size: int = 4096,
+        passes: int = 3,
+        max_clusters: int = 15,
+        random_state: int = 42
+    ):
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.passes = passes
+        self.max_clusters = max_clusters
+        self.random_state = random_state
+        self.scaler: Optional[StandardScaler] = None
+        self.cluster_centers_: Optional[np.ndarray] = None
+
+    def _chunks(self, features: np.ndarray):
+        for start in range(0, len(features), self.chunk_size):
+            yield features[start:start + self.chunk_size]
+
+    def fit_predict(self, features: np.ndarray, n_clusters: Union[int, str] = 5) -> Dict:
+        """
+        Fit on ``features`` and label every row.
+
+        Args:
+            features: Raw feature matrix, shape (n_items, n_features)
+            n_clusters: Number of clusters, or 'auto' to pick one from an
+                over-clustered fit merged down with Ward's criterion
+
+        Returns:
+            Dictionary with labels, inertia, centroids and (for 'auto') the inertia curve
+        """
+        features = np.asarray(features, dtype=np.float64)
+        self.scaler = StandardScaler()
+        for chunk in self._chunks(features):
+            self.scaler.partial_fit(chunk)
+
+        result = {}
+        if n_clusters == 'auto':
+            k_max = min(self.max_clusters, len(features))
+            model = self._fit_model(features, k_max, init=None)
+            labels, base_inertia = self._assign(features, model.cluster_centers_)
+            counts = np.bincount(labels, minlength=k_max)
+
+            path = ward_merge_path(model.cluster_centers_, counts, k_min=2)
+            ks = np.array(sorted(path))
+            inertias = np.array([base_inertia + path[k][1] for k in ks])
+            n_clusters = elbow(ks, inertias)
+            init = path[n_clusters][0]
+            result['inertia_curve'] = dict(zip(ks.tolist(), inertias.tolist()))
+        else:
+            init = None
+            if self.cluster_centers_ is not None and len(self.cluster_centers_) == n_clusters:
+                init = self.scaler.transform(self.cluster_centers_)
+
+        model = self._fit_model(features, n_clusters, init=init)
+        labels, inertia = self._assign(features, model.cluster_centers_)
+        self.cluster_centers_ = self.scaler.inverse_transform(model.cluster_centers_)
+
+        result.update({
+            'labels': labels,
+            'n_clusters': int(n_clusters),
+            'inertia': inertia,
+            'cluster_centers': self.cluster_centers_
+        })
+        return result
+
+    def _fit_model(self, features: np.ndarray, n_clusters: int, init: Optional[np.ndarray]) -> MiniBatchKMeans:
+        model = MiniBatchKMeans(
+            n_clusters=n_clusters,
+            init=init if init is not None else 'k-means++',
+            n_init=1 if init is not None else 3,
+            batch_size=self.batch_size,
+            random_state=self.random_state
+        )
+        for _ in range(self.passes):
+            for chunk in self._chunks(features):
+                model.partial_fit(self.scaler.transform(chunk))
+        return model
+
+    def _assign(self, features: np.ndarray, centers: np.ndarray) -> Tuple[np.ndarray, float]:
+        """Nearest-centroid labels and total squared distance, chunk by chunk."""
+        labels = np.empty(len(features), dtype=np.int64)
+        inertia = 0.0
+        offset = 0
+        for chunk in self._chunks(features):
+            scaled = self.scaler.transform(chunk)
+            sq = ((scaled[:, None, :] - centers[None, :, :]) ** 2).sum(axis=-1)
+            chunk_labels = sq.argmin(axis=1)
+            labels[offset:offset + len(chunk)] = chunk_labels
+            inertia += sq[np.arange(len(chunk)), chunk_labels].sum()
+            offset += len(chunk)
+        return labels, float(inertia)
@@ -0,0 +1,227 @@
+"""
+Vectorized additive Holt-Winters smoothing over matrices of aligned series
+"""
+import itertools
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+from models.forecasting.intermittent import to_matrix
+
+SeriesKey = Tuple[str, str]
+
+
+class HoltWintersEngine:
+    """
+    Damped additive Holt-Winters fitted to every row of a matrix at once.
+
+    Each row gets its own smoothing parameters: every (alpha, beta, gamma)
+    combination of the grid is run side by side as one array of shape
+    (n_series, n_combinations), and each row keeps the combination with the
+    lowest one-step-ahead squared error. The recursion walks time once, so
+    cost grows with series x grid x days but never loops over series.
+
+    Rows are right-aligned on their latest day; leading NaN (shorter
+    history) is back-filled with the row's first observed season and
+    interior NaN is replaced by the one-step forecast, so gaps leave the
+    state untouched. Rows with ``seasonal`` False fit level and trend only.
+    """
+
+    def __init__(
+        self,
+        season_length: int = 7,
+        damping: float = 0.98,
+        alphas: Sequence[float] = (0.05, 0.15, 0.3, 0.5),
+        betas: Sequence[float] = (0.01, 0.05, 0.15),
+        gammas: Sequence[float] = (0.05, 0.15, 0.3),
+        interval_z: float = 1.96
+    ):
+        self.season_length = season_length
+        self.damping = damping
+        self.grid = np.array(list(itertools.product(alphas, betas, gammas)))
+        self.interval_z = interval_z
+        self.state: Optional[Dict[str, np.ndarray]] = None
+
+    def fit(self, series, seasonal: Optional[np.ndarray] = None) -> 'HoltWintersEngine':
+        """
+        Select parameters and smooth every row.
+
+        Args:
+            series: 2-D array (NaN = not observed) or list of 1-D arrays,
+                each at least two seasons long
+            seasonal: Per-row booleans; False drops the seasonal term
+
+        Returns:
+            self, with the final state stored for ``predict``
+        """
+        m = self.season_length
+        raw = to_matrix(series)
+        scored = ~np.isnan(raw)
+        matrix = self._fill_leading(raw)
+        n_series, n_obs = matrix.shape
+        if n_obs < 2 * m:
+            raise ValueError(f"Holt-Winters needs at least {2 * m} observations per series")
+
+        seasonal = np.ones(n_series, dtype=bool) if seasonal is None else np.asarray(seasonal, dtype=bool)
+        alpha, beta, gamma = (self.grid[:, i][None, :] for i in range(3))
+        gamma = np.where(seasonal[:, None], gamma, 0.0)
+        phi = self.damping
+
+        # Classic initialisation from the first two seasons
+        first, second = np.nanmean(matrix[:, :m], axis=1), np.nanmean(matrix[:, m:2 * m], axis=1)
+        n_grid = len(self.grid)
+        level = np.repeat(first[:, None], n_grid, axis=1)
+        trend = np.repeat(((second - first) / m)[:, None], n_grid, axis=1)
+        season = np.where(seasonal[:, None], np.nan_to_num(matrix[:, :m] - first[:, None]), 0.0)
+        # Season slot first so each step reads and writes one contiguous (n_series, n_grid) block
+        season = np.repeat(season.T[:, :, None], n_grid, axis=2)
+
+        # Only real observations count towards parameter choice and sigma, not back-filled ones
+        sse = np.zeros((n_series, n_grid))
+        observed = np.zeros((n_series, 1))
+        for t in range(n_obs):
+            s = season[t % m]
+            predicted = level + phi * trend + s
+            x = matrix[:, t][:, None]
+            x = np.where(np.isnan(x), predicted, x)
+            if t >= m:
+                weight = scored[:, t][:, None]
+                sse += weight * (x - predicted) ** 2
+                observed += weight
+
+            new_level = alpha * (x - s) + (1 - alpha) * (level + phi * trend)
+            trend = beta * (new_level - level) + (1 - beta) * phi * trend
+            season[t % m] = gamma * (x - new_level) + (1 - gamma) * s
+            level = new_level
+
+        best = np.argmin(sse, axis=1)
+        rows = np.arange(n_series)
+        self.state = {
+            'level': level[rows, best],
+            'trend': trend[rows, best],
+            'season': season[:, rows, best].T,
+            'params': np.column_stack([self.grid[best, 0], self.grid[best, 1], gamma[rows, best]]),
+            'sigma': np.sqrt(sse[rows, best] / np.maximum(observed[:, 0], 1)),
+            'next_season_index': np.full(n_series, n_obs % m)
+        }
+        return self
+
+    def predict(self, periods: int) -> Dict[str, np.ndarray]:
+        """
+        Forecast every fitted row ``periods`` steps ahead.
+
+        Intervals use the additive Holt-Winters forecast variance (ignoring
+        damping) scaled by ``interval_z``.
+
+        Returns:
+            Dictionary with 'forecast', 'lower_bound' and 'upper_bound'
+            arrays of shape (n_series, periods)
+        """
+        if self.state is None:
+            raise RuntimeError("HoltWintersEngine must be fitted before predicting")
+
+        m = self.season_length
+        state = self.state
+        h = np.arange(1, periods + 1)
+        damped = np.cumsum(self.damping ** h)
+        season_index = (state['next_season_index'][:, None] + h[None, :] - 1) % m
+        seasonal = np.take_along_axis(state['season'], season_index, axis=1)
+        forecast = state['level'][:, None] + damped[None, :] * state['trend'][:, None] + seasonal
+
+        alpha, beta, gamma = (state['params'][:, i][:, None] for i in range(3))
+        j = np.arange(1, periods)[None, :]
+        psi = alpha * (1 + j * beta) + gamma * (j % m == 0)
+        variance = np.concatenate([np.zeros((len(forecast), 1)), np.cumsum(psi ** 2, axis=1)], axis=1) + 1.0
+        spread = self.interval_z * state['sigma'][:, None] * np.sqrt(variance)
+
+        return {
+            'forecast': forecast,
+            'lower_bound': forecast - spread,
+            'upper_bound': forecast + spread
+        }
+
+    def forecast_frames(
+        self,
+        series: Iterable[Tuple[SeriesKey, pd.DataFrame]],
+        periods: int = 30,
+        seasonal: Optional[Dict[SeriesKey, bool]] = None,
+        max_history: int = 364,
+        batch_series: int = 4096
+    ) -> Iterator[Tuple[SeriesKey, pd.DataFrame]]:
+        """
+        Forecast (key, DataFrame[date, value]) series in batches.
+
+        Only the latest ``max_history`` days of each series are used.
+
+        Yields:
+            (key, DataFrame with date, forecast, lower_bound, upper_bound),
+            the layout ``DemandForecaster.forecast`` returns
+        """
+        seasonal = seasonal or {}
+
+        def flush(batch):
+            values = [data.iloc[-max_history:, 1].to_numpy(dtype=np.float64) for _, data in batch]
+            mask = np.array([seasonal.get(key, True) for key, _ in batch])
+            result = self.fit(values, mask).predict(periods)
+            for row, (key, data) in enumerate(batch):
+                last_date = pd.Timestamp(data.iloc[-1, 0])
+                yield key, pd.DataFrame({
+                    'date': pd.date_range(start=last_date, periods=periods + 1, freq='D')[1:],
+                    'forecast': result['forecast'][row],
+                    'lower_bound': result['lower_bound'][row],
+                    'upper_bound': result['upper_bound'][row]
+                })
+
+        batch = []
+        for key, data in series:
+            batch.append((key, data))
+            if len(batch) >= batch_series:
+                yield from flush(batch)
+                batch = []
+        if batch:
+            yield from flush(batch)
+
+    def _fill_leading(self, matrix: np.ndarray) -> np.ndarray:
+        """Back-fill each row's leading NaN by repeating its first observed season."""
+        observed = ~np.isnan(matrix)
+        start = np.where(observed.any(axis=1), observed.argmax(axis=1), 0)
+        if not start.any():
+            return matrix
+
+        t = np.arange(matrix.shape[1])[None, :]
+        source = np.minimum(start[:, None] + (t - start[:, None]) % self.season_length, matrix.shape[1] - 1)
+        filled = np.take_along_axis(matrix, source, axis=1)
+        return np.where(t < start[:, None], filled, matrix)
+
+
+def holt_winters_paths(values: np.ndarray, cutoffs: np.ndarray, horizon: int) -> np.ndarray:
+    """
+    Holt-Winters forecasts of one series from every cutoff at once.
+
+    Each window's training history becomes one row of a right-aligned
+    matrix, so all windows are fitted in a single engine pass.
+
+    Returns:
+        Forecasts of shape (len(cutoffs), horizon)
+    """
+    return HoltWintersEngine().fit([values[:cutoff] for cutoff in cutoffs]).predict(horizon)['forecast']
+
+
+# Example usage
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(42)
+    n, days, horizon = 10000, 364, 28
+    t = np.arange(days + horizon)
+    level = rng.uniform(20, 500, (n, 1))
+    demand = level * (1 + 0.001 * t + 0.25 * rng.random((n, 1)) * np.sin(2 * np.pi * t / 7)) + rng.normal(0, 1, (n, len(t))) * 0.1 * level
+    history, actual = demand[:, :days], demand[:, days:]
+
+    started = time.perf_counter()
+    result = HoltWintersEngine().fit(history).predict(horizon)
+    elapsed = time.perf_counter() - started
+
+    coverage = np.mean((actual >= result['lower_bound']) & (actual <= result['upper_bound']))
+    print(f"Fitted and forecast {n} series x {days} days in {elapsed:.1f}s")
+    print(f"Scaled MAE: {np.mean(np.abs(result['forecast'] - actual) / level):.3f}, 95% interval coverage: {coverage:.1%}")
@@ -0,0 +1,168 @@
+"""
+Demand classification and vectorized Croston-family forecasts for sparse SKUs
+"""
+import numpy as np
+from typing import Dict, Sequence, Union
+
+# Syntetos-Boylan cut-offs on average demand interval and squared CV of demand sizes
+ADI_CUTOFF = 1.32
+CV2_CUTOFF = 0.49
+
+DEMAND_CLASSES = ('smooth', 'erratic', 'intermittent', 'lumpy')
+SPARSE_CLASSES = ('intermittent', 'lumpy')
+METHODS = ('croston', 'sba', 'tsb')
+
+SeriesInput = Union[np.ndarray, Sequence[np.ndarray]]
+
+
+def to_matrix(series: SeriesInput) -> np.ndarray:
+    """Stack series into one array, left-padding shorter ones with NaN so the latest days line up."""
+    if isinstance(series, np.ndarray) and series.ndim == 2:
+        return series.astype(np.float64, copy=False)
+
+    series = [np.asarray(values, dtype=np.float64) for values in series]
+    matrix = np.full((len(series), max((len(v) for v in series), default=0)), np.nan)
+    for row, values in enumerate(series):
+        if len(values):
+            matrix[row, -len(values):] = values
+    return matrix
+
+
+def classify_demand(series: SeriesInput) -> Dict[str, np.ndarray]:
+    """
+    ADI / CV² demand classification of every series at once.
+
+    ADI is observed days per non-zero demand day and CV² the squared
+    coefficient of variation of the non-zero demand sizes. Series with no
+    demand at all are 'intermittent' with infinite ADI.
+
+    Args:
+        series: 2-D array (NaN = not observed) or list of 1-D arrays
+
+    Returns:
+        Dictionary with 'adi', 'cv2' and 'category' arrays, one entry per series
+    """
+    matrix = to_matrix(series)
+    observed = (~np.isnan(matrix)).sum(axis=1)
+    sizes = np.where(matrix > 0, matrix, 0.0)
+    n_demand = (sizes > 0).sum(axis=1)
+
+    counts = np.maximum(n_demand, 1)
+    mean = sizes.sum(axis=1) / counts
+    variance = np.maximum((sizes ** 2).sum(axis=1) / counts - mean ** 2, 0.0)
+    adi = np.where(n_demand > 0, observed / counts, np.inf)
+    cv2 = np.where(n_demand > 1, variance / np.where(mean > 0, mean, 1.0) ** 2, 0.0)
+
+    sparse = adi >= ADI_CUTOFF
+    variable = cv2 >= CV2_CUTOFF
+    category = np.select(
+        [~sparse & ~variable, ~sparse & variable, sparse & ~variable],
+        ['smooth', 'erratic', 'intermittent'],
+        default='lumpy'
+    )
+    return {'adi': adi, 'cv2': cv2, 'category': category}
+
+
+def fitted_levels(series: SeriesInput, method: str = 'sba', alpha: float = 0.1, beta: float = 0.1) -> np.ndarray:
+    """
+    One-step-ahead forecast level of every series after each day.
+
+    The smoothing recursions run once over time with every series updated
+    in the same array operation. Croston smooths demand size and interval
+    on demand days; SBA is Croston with the (1 - alpha / 2) bias
+    correction; TSB smooths demand probability every observed day, so
+    forecasts decay for items that stop selling. Levels are zero until a
+    series' first demand.
+
+    Args:
+        series: 2-D array (NaN = not observed) or list of 1-D arrays
+        method: 'croston', 'sba' or 'tsb'
+        alpha: Smoothing of demand size (and interval for Croston/SBA)
+        beta: Smoothing of demand probability (TSB only)
+
+    Returns:
+        Array of shape (n_series, n_obs); column t is the forecast for t + 1
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method '{method}', expected one of {METHODS}")
+
+    matrix = to_matrix(series)
+    n_series, n_obs = matrix.shape
+    size = np.zeros(n_series)
+    rate = np.zeros(n_series)  # interval for Croston/SBA, probability for TSB
+    interval = np.zeros(n_series)
+    started = np.zeros(n_series, dtype=bool)
+    levels = np.zeros((n_series, n_obs))
+
+    for t in range(n_obs):
+        x = matrix[:, t]
+        observed = ~np.isnan(x)
+        demand = observed & (x > 0)
+        interval += observed
+        first = demand & ~started
+        update = demand & started
+
+        size[first] = x[first]
+        size[update] += alpha * (x[update] - size[update])
+        if method == 'tsb':
+            rate[first] = 1.0 / interval[first]
+            seen = observed & started
+            rate[seen] += beta * (demand[seen] - rate[seen])
+        else:
+            rate[first] = interval[first]
+            rate[update] += alpha * (interval[update] - rate[update])
+
+        started |= first
+        interval[demand] = 0
+
+        if method == 'tsb':
+            levels[:, t] = np.where(started, rate * size, 0.0)
+        else:
+            levels[:, t] = np.where(started, size / np.where(started, rate, 1.0), 0.0)
+
+    if method == 'sba':
+        levels *= 1 - alpha / 2
+    return levels
+
+
+def intermittent_forecast(series: SeriesInput, method: str = 'sba', alpha: float = 0.1, beta: float = 0.1) -> np.ndarray:
+    """Flat per-day forecast of every series, shape (n_series,)."""
+    return fitted_levels(series, method, alpha, beta)[:, -1]
+
+
+def intermittent_paths(values: np.ndarray, cutoffs: np.ndarray, horizon: int, method: str = 'sba') -> np.ndarray:
+    """
+    Croston-family forecasts of one series from every cutoff at once.
+
+    The recursion is causal, so one pass over the series gives the level
+    after each day and a window's flat forecast is read at its cutoff.
+
+    Returns:
+        Forecasts of shape (len(cutoffs), horizon)
+    """
+    levels = fitted_levels(values[None, :], method)[0]
+    return np.repeat(levels[cutoffs - 1][:, None], horizon, axis=1)
+
+
+# Example usage
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(42)
+    n, days = 20000, 365
+    probability = rng.uniform(0.02, 1.0, (n, 1))
+    demand = (rng.random((n, days)) < probability) * rng.poisson(rng.uniform(1, 20, (n, 1)), (n, days))
+
+    started = time.perf_counter()
+    classes = classify_demand(demand)
+    elapsed = time.perf_counter() - started
+    counts = {name: int((classes['category'] == name).sum()) for name in DEMAND_CLASSES}
+    print(f"Classified {n} series in {elapsed * 1000:.0f}ms: {counts}")
+
+    sparse = np.isin(classes['category'], SPARSE_CLASSES)
+    for method in METHODS:
+        started = time.perf_counter()
+        forecast = intermittent_forecast(demand[sparse, :-28], method)
+        elapsed = time.perf_counter() - started
+        mae = np.mean(np.abs(demand[sparse, -28:] - forecast[:, None]))
+        print(f"{method:>7}: {sparse.sum()} sparse series in {elapsed * 1000:.0f}ms, MAE {mae:.3f}")
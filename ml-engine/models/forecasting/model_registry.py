@@ -0,0 +1,301 @@
+"""
+Registry of fitted forecasting models with data fingerprints and warm starts
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from models.forecasting.prophet_model import DEFAULT_MEMBER_TIMEOUT, DemandForecaster, inverse_error_weights, prophet_init, run_members
+from models.forecasting.seasonality import detect_series
+
+
+def data_fingerprint(data: pd.DataFrame) -> str:
+    """Hash of a series' dates and values; identical history gives an identical fingerprint."""
+    dates = pd.to_datetime(data.iloc[:, 0]).to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    values = data.iloc[:, 1].to_numpy(dtype=np.float64)
+    return hashlib.sha1(dates.tobytes() + values.tobytes()).hexdigest()
+
+
+class ModelRegistry:
+    """
+    Persist fitted models per (warehouse, item, model_type).
+
+    Each entry records the fingerprint and length of the history it was
+    fitted on. A request with the same history reuses the model (and any
+    forecast already produced for the same horizon); a request whose
+    history starts with the recorded one warm-starts the fit from the
+    stored parameters; anything else is fitted from scratch.
+
+    Prophet models are stored with ``model_to_json`` and ARIMA models as
+    their searched order and fitted parameters. Ensembles fit their members
+    concurrently through the member entries, drop any member still running
+    after ``member_timeout`` seconds, and only cache the combined forecast
+    when every member made it. Entries live as JSON files under ``root``
+    and are evicted once unused for ``max_age_seconds`` or, least recently
+    used first, when the directory outgrows ``max_bytes``; ``evict`` runs
+    every ``evict_interval`` saves.
+    """
+
+    MODEL_TYPES = DemandForecaster.MODEL_TYPES
+
+    def __init__(
+        self,
+        root: str,
+        max_age_seconds: float = 7 * 86400,
+        max_bytes: int = 2 * 1024 ** 3,
+        max_memory_entries: int = 1024,
+        evict_interval: int = 256,
+        member_timeout: Optional[float] = DEFAULT_MEMBER_TIMEOUT
+    ):
+        self.root = root
+        self.member_timeout = member_timeout
+        self.max_age_seconds = max_age_seconds
+        self.max_bytes = max_bytes
+        self.max_memory_entries = max_memory_entries
+        self.evict_interval = evict_interval
+        self._saves = 0
+        self._memory: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def path(self, warehouse_id: str, item_id: str, model_type: str) -> str:
+        """Registry file for one series and model type."""
+        return os.path.join(self.root, str(warehouse_id), str(item_id), f"{model_type}.json")
+
+    def forecast(
+        self,
+        warehouse_id: str,
+        item_id: str,
+        data: pd.DataFrame,
+        model_type: str = 'prophet',
+        periods: int = 30,
+        member_errors: Optional[Dict[str, float]] = None
+    ) -> Tuple[pd.DataFrame, str]:
+        """
+        Forecast a series, reusing or warm-starting registered models.
+
+        Args:
+            warehouse_id: Warehouse of the series
+            item_id: Item of the series
+            data: DataFrame with date and value columns, sorted by date
+            model_type: One of MODEL_TYPES
+            periods: Number of periods to forecast
+            member_errors: Backtest error per ensemble member, used to weight
+                the ensemble (plain mean when missing)
+
+        Returns:
+            (forecast with date, forecast, lower_bound, upper_bound; how it
+            was produced: 'cached', 'reused', 'warm_start', 'fitted', or
+            'partial' for an ensemble that dropped a member)
+        """
+        if model_type not in self.MODEL_TYPES:
+            raise ValueError(f"Unknown model_type '{model_type}', expected one of {self.MODEL_TYPES}")
+
+        fingerprint = data_fingerprint(data)
+        path = self.path(warehouse_id, item_id, model_type)
+        entry = self._load(path)
+
+        horizon_key = str(periods)
+        if model_type == 'ensemble' and member_errors:
+            horizon_key += ':' + hashlib.sha1(json.dumps(member_errors, sort_keys=True).encode()).hexdigest()[:12]
+
+        if entry is not None and entry['fingerprint'] == fingerprint and horizon_key in entry['forecasts']:
+            self._touch(path)
+            return pd.DataFrame(entry['forecasts'][horizon_key]).astype({'date': 'datetime64[ns]'}), 'cached'
+
+        mode = self._mode(entry, data, fingerprint)
+        forecaster = DemandForecaster()
+        seasonality = None
+
+        if model_type == 'prophet':
+            from prophet.serialize import model_from_json, model_to_json
+
+            model = None
+            init = None
+            seasonality = entry.get('seasonality') if mode == 'reused' else detect_series([data.iloc[:, 1].to_numpy()])[0]
+            if mode == 'reused':
+                model = model_from_json(entry['model'])
+            elif mode == 'warm_start' and entry.get('seasonality') == seasonality:
+                # Stan parameters only carry over while the seasonal terms stay the same
+                init = prophet_init(model_from_json(entry['model']))
+            forecast = forecaster.forecast(data, 'prophet', periods, seasonality=seasonality, init=init, model=model)
+            stored_model = model_to_json(forecaster.prophet_model) if mode != 'reused' else entry['model']
+        elif model_type == 'arima':
+            previous = np.asarray(entry['model']['params']) if mode != 'fitted' else None
+            # The searched order is kept with the parameters so refits skip the search;
+            # entries written before the search existed were all fitted as (1, 1, 1)
+            order = tuple(entry['model'].get('order', (1, 1, 1))) if mode != 'fitted' else None
+            forecast = forecaster.forecast(
+                data,
+                'arima',
+                periods,
+                order=order,
+                start_params=previous if mode == 'warm_start' else None,
+                params=previous if mode == 'reused' else None
+            )
+            stored_model = {
+                'order': list(forecaster.arima_order),
+                'params': np.asarray(forecaster.arima_results.params).tolist()
+            }
+        elif model_type != 'ensemble':
+            # Moving-average, Holt-Winters and Croston-family forecasts are cheaper to recompute than to store
+            forecast = forecaster.forecast(data, model_type, periods)
+            stored_model = None
+        else:
+            # Same concurrency, budget and weighting as DemandForecaster.ensemble_forecast, over registered members
+            results, _, dropped = run_members(
+                {
+                    name: lambda name=name: self.forecast(warehouse_id, item_id, data, name, periods)[0]
+                    for name in ('prophet', 'arima', 'lstm')
+                },
+                self.member_timeout
+            )
+            if not results:
+                raise RuntimeError(f"No ensemble member finished: {dropped}")
+            weights = inverse_error_weights(member_errors, list(results))
+            forecast = pd.DataFrame({
+                'date': next(iter(results.values()))['date'],
+                'forecast': sum(weights[name] * member['forecast'].to_numpy() for name, member in results.items()),
+                'lower_bound': np.nan,
+                'upper_bound': np.nan
+            })
+            if dropped:
+                # Not cached, so the next request tries the full ensemble again
+                return forecast, 'partial'
+            stored_model = None
+
+        forecasts = entry['forecasts'] if entry is not None and mode == 'reused' else {}
+        forecasts[horizon_key] = {
+            'date': forecast['date'].astype(str).tolist(),
+            'forecast': forecast['forecast'].tolist(),
+            'lower_bound': forecast['lower_bound'].tolist(),
+            'upper_bound': forecast['upper_bound'].tolist()
+        }
+        self._save(path, {
+            'fingerprint': fingerprint,
+            'n_obs': len(data),
+            'model': stored_model,
+            'seasonality': seasonality,
+            'forecasts': forecasts,
+            'fitted_at': entry['fitted_at'] if mode == 'reused' else time.time()
+        })
+        return forecast, mode
+
+    def arima_order(self, warehouse_id: str, item_id: str, data: pd.DataFrame) -> Optional[Tuple[int, int, int]]:
+        """
+        ARIMA order registered for a series.
+
+        Returns:
+            The order, when ``data`` is the registered history or extends
+            it; None when the series has to be searched again
+        """
+        entry = self._load(self.path(warehouse_id, item_id, 'arima'))
+        if self._mode(entry, data, data_fingerprint(data)) == 'fitted':
+            return None
+        return tuple(entry['model'].get('order', (1, 1, 1)))
+
+    def register_arima(self, warehouse_id: str, item_id: str, data: pd.DataFrame, order: Tuple[int, int, int], params: np.ndarray):
+        """
+        Record an ARIMA fit made outside the registry, so later fits of the
+        series (here or through ``forecast``) reuse its order.
+        """
+        path = self.path(warehouse_id, item_id, 'arima')
+        fingerprint = data_fingerprint(data)
+        entry = self._load(path)
+        if entry is not None and entry['fingerprint'] == fingerprint:
+            # Already registered for this history; keep its cached forecasts
+            return
+        self._save(path, {
+            'fingerprint': fingerprint,
+            'n_obs': len(data),
+            'model': {'order': list(order), 'params': np.asarray(params).tolist()},
+            'seasonality': None,
+            'forecasts': {},
+            'fitted_at': time.time()
+        })
+
+    def evict(self) -> int:
+        """
+        Drop entries unused for ``max_age_seconds``, then the least recently
+        used ones until the registry fits in ``max_bytes``.
+
+        Returns:
+            Number of entries removed
+        """
+        files = []
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                if name.endswith('.json'):
+                    path = os.path.join(directory, name)
+                    stat = os.stat(path)
+                    files.append((stat.st_mtime, stat.st_size, path))
+
+        now = time.time()
+        removed = 0
+        total = sum(size for _, size, _ in files)
+        for mtime, size, path in sorted(files):
+            if now - mtime <= self.max_age_seconds and total <= self.max_bytes:
+                break
+            os.remove(path)
+            with self._lock:
+                self._memory.pop(path, None)
+            total -= size
+            removed += 1
+        return removed
+
+    def _mode(self, entry: Optional[Dict], data: pd.DataFrame, fingerprint: str) -> str:
+        if entry is None:
+            return 'fitted'
+        if entry['fingerprint'] == fingerprint:
+            return 'reused'
+        if entry['model'] is None:
+            return 'fitted'
+        n_obs = entry['n_obs']
+        if len(data) > n_obs and data_fingerprint(data.iloc[:n_obs]) == entry['fingerprint']:
+            return 'warm_start'
+        return 'fitted'
+
+    def _load(self, path: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._memory.get(path)
+            if entry is not None:
+                self._memory.move_to_end(path)
+                return entry
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            entry = json.load(f)
+        self._remember(path, entry)
+        return entry
+
+    def _save(self, path: str, entry: Dict):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+        self._remember(path, entry)
+
+        self._saves += 1
+        if self._saves % self.evict_interval == 0:
+            self.evict()
+
+    def _touch(self, path: str):
+        """Mark an entry as used so size-based eviction keeps it."""
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._memory.pop(path, None)
+
+    def _remember(self, path: str, entry: Dict):
+        with self._lock:
+            self._memory[path] = entry
+            self._memory.move_to_end(path)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
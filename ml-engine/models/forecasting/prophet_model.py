@@ -5,18 +5,150 @@ import numpy as np
 import pandas as pd
 from prophet import Prophet
 from statsmodels.tsa.arima.model import ARIMA
+from models.forecasting.arima_search import select_arima_order
+from models.forecasting.holt_winters import HoltWintersEngine
+from models.forecasting.intermittent import METHODS as INTERMITTENT_METHODS, intermittent_forecast
+from models.forecasting.seasonality import detect_seasonality_batch
 from sklearn.preprocessing import MinMaxScaler
-from sklearn.metrics import mean_absolute_percentage_error, mean_squared_error
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+import os
+import threading
+import time
 import warnings
 warnings.filterwarnings('ignore')
 
+# Seconds an ensemble member may take before it is dropped
+DEFAULT_MEMBER_TIMEOUT = 60.0
+# Threads shared by the members of every ensemble in the process
+MEMBER_WORKERS = 6
+
+_member_pool: Optional[ThreadPoolExecutor] = None
+_member_pool_lock = threading.Lock()
+
+
+def _shared_member_pool() -> ThreadPoolExecutor:
+    global _member_pool
+    with _member_pool_lock:
+        if _member_pool is None:
+            _member_pool = ThreadPoolExecutor(max_workers=MEMBER_WORKERS, thread_name_prefix='ensemble-member')
+        return _member_pool
+
+
+def _forget_member_pool():
+    # A forked child (e.g. a fleet worker) inherits the pool object but none of its threads
+    global _member_pool, _member_pool_lock
+    _member_pool = None
+    _member_pool_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget_member_pool)
+
+
+def inverse_error_weights(errors: Optional[Dict[str, float]], members: List[str]) -> Dict[str, float]:
+    """Weights proportional to 1 / error over ``members``; equal weights if any error is missing."""
+    errors = errors or {}
+    values = [errors.get(name) for name in members]
+    if any(v is None or not np.isfinite(v) for v in values):
+        return {name: 1.0 / len(members) for name in members}
+    inverse = np.array([1.0 / max(v, 1e-9) for v in values])
+    return dict(zip(members, (inverse / inverse.sum()).tolist()))
+
+
+def _timed(run: Callable) -> Tuple[Dict, float]:
+    started = time.perf_counter()
+    return run(), time.perf_counter() - started
+
+
+def run_members(members: Dict[str, Callable], timeout: Optional[float]) -> Tuple[Dict, Dict, Dict]:
+    """
+    Run ensemble members concurrently, giving up on any still running after ``timeout``.
+
+    Members run on one pool of ``MEMBER_WORKERS`` threads shared by every
+    ensemble in the process, and ``timeout`` counts from submission, queueing
+    included. A member that has not started by then is cancelled; one that
+    overruns cannot be interrupted and keeps its thread until it finishes, so
+    repeated timeouts hold at most ``MEMBER_WORKERS`` fits and later members
+    queue behind them instead of piling up. Each member must only touch state
+    of its own, and must not wait on other members.
+
+    Args:
+        members: Zero-argument callables by member name
+        timeout: Seconds to wait for the members (None waits for all)
+
+    Returns:
+        (results, seconds and drop reasons, each keyed by member name)
+    """
+    pool = _shared_member_pool()
+    futures = {pool.submit(_timed, run): name for name, run in members.items()}
+    done, pending = wait(futures, timeout=timeout)
+    for future in pending:
+        future.cancel()
+
+    results, member_seconds, dropped = {}, {}, {}
+    for future, name in futures.items():
+        if future not in done:
+            dropped[name] = f"exceeded {timeout}s"
+        elif future.exception() is not None:
+            dropped[name] = f"{type(future.exception()).__name__}: {future.exception()}"
+        else:
+            results[name], member_seconds[name] = future.result()
+    return results, member_seconds, dropped
+
+
+def seasonality_components(forecast: pd.DataFrame) -> Dict:
+    """Last year of the yearly component and last week of the weekly one."""
+    return {
+        'yearly': forecast[['ds', 'yearly']].tail(365) if 'yearly' in forecast.columns else None,
+        'weekly': forecast[['ds', 'weekly']].tail(7) if 'weekly' in forecast.columns else None
+    }
+
+
+def prophet_init(model: Prophet) -> Dict:
+    """Fitted Stan parameters of ``model`` in the form ``Prophet.fit(init=...)`` accepts."""
+    return {
+        name: model.params[name][0][0] if name in ('k', 'm', 'sigma_obs') else model.params[name][0]
+        for name in ('k', 'm', 'sigma_obs', 'delta', 'beta')
+    }
+
+
+class ProphetDiagnostics:
+    """Full-history prediction, seasonality and component plots of a fitted Prophet model, built on first use."""
+    
+    def __init__(self, model: Prophet, periods: int, freq: str = 'D'):
+        self.model = model
+        self.periods = periods
+        self.freq = freq
+        self._forecast = None
+    
+    def forecast(self) -> pd.DataFrame:
+        """Prediction over history and horizon, as the non-lean mode returns it."""
+        if self._forecast is None:
+            future = self.model.make_future_dataframe(periods=self.periods, freq=self.freq)
+            self._forecast = self.model.predict(future)
+        return self._forecast
+    
+    def seasonality(self) -> Dict:
+        """Yearly and weekly components, as the non-lean mode returns them."""
+        return seasonality_components(self.forecast())
+    
+    def plot_components(self):
+        """Matplotlib figure of trend and seasonal components."""
+        return self.model.plot_components(self.forecast())
+
 
 class DemandForecaster:
     """Multi-model demand forecasting system."""
     
+    MODEL_TYPES = ('prophet', 'arima', 'lstm', 'ensemble', 'holt_winters') + INTERMITTENT_METHODS
+    
     def __init__(self):
         self.prophet_model = None
         self.arima_model = None
+        self.arima_results = None
+        self.arima_order = None
+        self.member_errors: Dict[str, float] = {}
+        self.neural_model = None
         self.scaler = MinMaxScaler()
     
     def prepare_data(self, data: pd.DataFrame, date_col: str = 'date', value_col: str = 'quantity') -> pd.DataFrame:
@@ -37,7 +169,16 @@ class DemandForecaster:
         df = df[[date_col, value_col]]
         return df
     
-    def forecast_prophet(self, data: pd.DataFrame, periods: int = 30, freq: str = 'D') -> Dict:
+    def forecast_prophet(
+        self,
+        data: pd.DataFrame,
+        periods: int = 30,
+        freq: str = 'D',
+        lean: bool = False,
+        init: Optional[Dict] = None,
+        model: Optional[Prophet] = None,
+        seasonality: Optional[Dict[str, bool]] = None
+    ) -> Dict:
         """
         Forecast using Facebook Prophet.
         
@@ -45,6 +186,13 @@ class DemandForecaster:
             data: DataFrame with 'ds' (date) and 'y' (value) columns
             periods: Number of periods to forecast
             freq: Frequency ('D' for daily, 'W' for weekly, 'M' for monthly)
+            lean: Predict only the horizon and return NumPy arrays; history
+                fit, seasonality and component plots come from
+                ``result['diagnostics']`` on demand
+            init: Stan parameters to start the fit from (see ``prophet_init``)
+            model: Already fitted model to predict with instead of fitting
+            seasonality: {'weekly': bool, 'yearly': bool} from the seasonality
+                detector; both terms are fitted when None
         
         Returns:
             Dictionary with forecast results
@@ -54,13 +202,31 @@ class DemandForecaster:
         df_prophet.columns = ['ds', 'y']
         
         # Initialize and fit model
-        self.prophet_model = Prophet(
-            yearly_seasonality=True,
-            weekly_seasonality=True,
-            daily_seasonality=False,
-            changepoint_prior_scale=0.05
-        )
-        self.prophet_model.fit(df_prophet)
+        if model is None:
+            seasonality = seasonality or {'weekly': True, 'yearly': True}
+            model = Prophet(
+                yearly_seasonality=seasonality['yearly'],
+                weekly_seasonality=seasonality['weekly'],
+                daily_seasonality=False,
+                changepoint_prior_scale=0.05
+            )
+            if init is not None:
+                model.fit(df_prophet, init=init)
+            else:
+                model.fit(df_prophet)
+        self.prophet_model = model
+        
+        if lean:
+            future = self.prophet_model.make_future_dataframe(periods=periods, freq=freq, include_history=False)
+            forecast = self.prophet_model.predict(future)
+            return {
+                'dates': forecast['ds'].to_numpy(),
+                'yhat': forecast['yhat'].to_numpy(),
+                'yhat_lower': forecast['yhat_lower'].to_numpy(),
+                'yhat_upper': forecast['yhat_upper'].to_numpy(),
+                'trend': forecast['trend'].to_numpy(),
+                'diagnostics': ProphetDiagnostics(self.prophet_model, periods, freq)
+            }
         
         # Make future dataframe
         future = self.prophet_model.make_future_dataframe(periods=periods, freq=freq)
@@ -72,38 +238,55 @@ class DemandForecaster:
         return {
             'forecast': forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']],
             'trend': forecast[['ds', 'trend']],
-            'seasonality': {
-                'yearly': forecast[['ds', 'yearly']].tail(365) if 'yearly' in forecast.columns else None,
-                'weekly': forecast[['ds', 'weekly']].tail(7) if 'weekly' in forecast.columns else None
-            },
+            'seasonality': seasonality_components(forecast),
             'components': self.prophet_model.plot_components(forecast)
         }
     
-    def forecast_arima(self, data: pd.DataFrame, order: tuple = (1, 1, 1), periods: int = 30) -> Dict:
+    def forecast_arima(
+        self,
+        data: pd.DataFrame,
+        order: Optional[tuple] = None,
+        periods: int = 30,
+        start_params: Optional[np.ndarray] = None,
+        params: Optional[np.ndarray] = None
+    ) -> Dict:
         """
         Forecast using ARIMA.
         
         Args:
             data: DataFrame with time series data
-            order: ARIMA order (p, d, q)
+            order: ARIMA order (p, d, q); searched with select_arima_order
+                when None. Pass the order a series was fitted with before
+                to skip the search on refits.
             periods: Number of periods to forecast
+            start_params: Parameters to start the optimizer from
+            params: Fitted parameters to reuse as-is (the data is only filtered)
         
         Returns:
             Dictionary with forecast results
         """
         # Extract values
-        values = data.iloc[:, 1].values
+        values = data.iloc[:, 1].to_numpy(dtype=np.float64)
         
         # Fit ARIMA model
-        self.arima_model = ARIMA(values, order=order)
-        fitted_model = self.arima_model.fit()
-        
-        # Forecast
-        forecast = fitted_model.forecast(steps=periods)
+        if order is None:
+            search = select_arima_order(values)
+            order = search['order']
+            self.arima_model = search['results'].model
+            fitted_model = search['results']
+        else:
+            self.arima_model = ARIMA(values, order=tuple(order))
+            if params is not None:
+                fitted_model = self.arima_model.filter(params)
+            else:
+                fitted_model = self.arima_model.fit(start_params=start_params)
+        self.arima_results = fitted_model
+        self.arima_order = tuple(order)
         
-        # Get confidence intervals
+        # Point forecast and confidence intervals from one prediction
         forecast_result = fitted_model.get_forecast(steps=periods)
-        conf_int = forecast_result.conf_int()
+        forecast = np.asarray(forecast_result.predicted_mean)
+        conf_int = np.asarray(forecast_result.conf_int())
         
         # Create forecast dataframe
         last_date = data.iloc[-1, 0]
@@ -112,12 +295,13 @@ class DemandForecaster:
         forecast_df = pd.DataFrame({
             'date': forecast_dates,
             'forecast': forecast,
-            'lower_bound': conf_int.iloc[:, 0],
-            'upper_bound': conf_int.iloc[:, 1]
+            'lower_bound': conf_int[:, 0],
+            'upper_bound': conf_int[:, 1]
         })
         
         return {
             'forecast': forecast_df,
+            'order': self.arima_order,
             'aic': fitted_model.aic,
             'bic': fitted_model.bic,
             'summary': fitted_model.summary()
@@ -125,30 +309,37 @@ class DemandForecaster:
     
     def forecast_lstm(self, data: pd.DataFrame, periods: int = 30, lookback: int = 7) -> Dict:
         """
-        Forecast using LSTM (simplified version).
+        Forecast with the global neural model, or a moving average without one.
+        
+        When ``self.neural_model`` holds a fitted GlobalNeuralForecaster and
+        the series covers its lookback, the forecast comes from that model.
+        Otherwise each step is the mean of the previous ``lookback`` values,
+        earlier forecasts included.
         
         Args:
             data: DataFrame with time series data
             periods: Number of periods to forecast
-            lookback: Number of past periods to use for prediction
+            lookback: Number of past periods to use for the moving average
         
         Returns:
             Dictionary with forecast results
         """
-        # Note: This is a simplified version. Full LSTM implementation would require TensorFlow/Keras
-        # For now, we'll use a simple moving average as a placeholder
-        
-        values = data.iloc[:, 1].values
-        
-        # Simple moving average forecast
-        forecast = []
-        for i in range(periods):
-            if len(values) >= lookback:
-                pred = np.mean(values[-lookback:])
-            else:
-                pred = np.mean(values)
-            forecast.append(pred)
-            values = np.append(values, pred)
+        values = data.iloc[:, 1].to_numpy(dtype=np.float64)
+        
+        model = self.neural_model
+        if model is not None and model.is_fitted and len(values) >= model.lookback:
+            forecast = model.predict(values[None, :], periods)[0].astype(np.float64)
+            model_type = 'Global MLP'
+            lookback = model.lookback
+        else:
+            # One preallocated buffer instead of growing the history every step
+            lookback = min(lookback, len(values))
+            window = np.empty(lookback + periods)
+            window[:lookback] = values[len(values) - lookback:]
+            for i in range(periods):
+                window[lookback + i] = window[i:lookback + i].mean()
+            forecast = window[lookback:]
+            model_type = 'LSTM (simplified)'
         
         last_date = data.iloc[-1, 0]
         forecast_dates = pd.date_range(start=last_date, periods=periods+1, freq='D')[1:]
@@ -160,32 +351,135 @@ class DemandForecaster:
         
         return {
             'forecast': forecast_df,
-            'model_type': 'LSTM (simplified)',
+            'model_type': model_type,
             'lookback': lookback
         }
     
-    def ensemble_forecast(self, data: pd.DataFrame, periods: int = 30) -> Dict:
+    def forecast_holt_winters(self, data: pd.DataFrame, periods: int = 30, seasonal: bool = True) -> Dict:
+        """
+        Forecast using damped additive Holt-Winters with weekly seasonality.
+        
+        Single-series use of HoltWintersEngine; fit whole catalogues with the
+        engine directly.
+        
+        Args:
+            data: DataFrame with time series data
+            periods: Number of periods to forecast
+            seasonal: Fit the weekly seasonal term
+        
+        Returns:
+            Dictionary with forecast results
+        """
+        values = data.iloc[:, 1].to_numpy(dtype=np.float64)
+        engine = HoltWintersEngine().fit(values[None, :], np.array([seasonal]))
+        result = engine.predict(periods)
+        
+        last_date = data.iloc[-1, 0]
+        forecast_dates = pd.date_range(start=last_date, periods=periods+1, freq='D')[1:]
+        
+        forecast_df = pd.DataFrame({
+            'date': forecast_dates,
+            'forecast': result['forecast'][0],
+            'lower_bound': result['lower_bound'][0],
+            'upper_bound': result['upper_bound'][0]
+        })
+        
+        alpha, beta, gamma = engine.state['params'][0]
+        return {
+            'forecast': forecast_df,
+            'params': {'alpha': alpha, 'beta': beta, 'gamma': gamma, 'damping': engine.damping}
+        }
+    
+    def forecast_intermittent(self, data: pd.DataFrame, periods: int = 30, method: str = 'sba') -> Dict:
+        """
+        Forecast a sparse, mostly-zero series with Croston, SBA or TSB.
+        
+        Args:
+            data: DataFrame with time series data
+            periods: Number of periods to forecast
+            method: 'croston', 'sba' or 'tsb'
+        
+        Returns:
+            Dictionary with forecast results (a flat expected daily demand)
+        """
+        values = data.iloc[:, 1].to_numpy(dtype=np.float64)
+        level = intermittent_forecast(values[None, :], method)[0]
+        
+        last_date = data.iloc[-1, 0]
+        forecast_dates = pd.date_range(start=last_date, periods=periods+1, freq='D')[1:]
+        
+        return {
+            'forecast': pd.DataFrame({'date': forecast_dates, 'forecast': np.full(periods, level)}),
+            'model_type': method
+        }
+    
+    def ensemble_forecast(
+        self,
+        data: pd.DataFrame,
+        periods: int = 30,
+        lean: bool = False,
+        member_timeout: Optional[float] = DEFAULT_MEMBER_TIMEOUT,
+        member_errors: Optional[Dict[str, float]] = None,
+        seasonality: Optional[Dict[str, bool]] = None,
+        arima_order: Optional[tuple] = None
+    ) -> Dict:
         """
         Create ensemble forecast combining Prophet, ARIMA, and LSTM.
         
+        Members are fitted concurrently, each on a forecaster of its own. A
+        member that fails or is still running after ``member_timeout`` seconds
+        is dropped and the others are re-weighted, so latency is bounded by
+        the slowest member kept; the fitted models of the kept members are
+        copied onto this forecaster.
+        
         Args:
             data: DataFrame with time series data
             periods: Number of periods to forecast
+            lean: Run Prophet in lean mode
+            member_timeout: Seconds the members may take (None waits for all)
+            member_errors: Backtest error per member (e.g. MAPE); weights are
+                inversely proportional to it. Defaults to ``self.member_errors``,
+                and to a plain mean when errors are missing
+            seasonality: Seasonal terms for Prophet (see forecast_prophet)
+            arima_order: Order for the ARIMA member (searched when None)
         
         Returns:
             Dictionary with ensemble forecast
         """
-        # Get individual forecasts
-        prophet_result = self.forecast_prophet(data, periods)
-        arima_result = self.forecast_arima(data, periods=periods)
-        lstm_result = self.forecast_lstm(data, periods=periods)
-        
-        # Combine forecasts (simple average)
-        prophet_forecast = prophet_result['forecast']['yhat'].tail(periods).values
-        arima_forecast = arima_result['forecast']['forecast'].values
-        lstm_forecast = lstm_result['forecast']['forecast'].values
+        # A member that overruns keeps writing to its own forecaster, never to this one
+        forecasters = {name: DemandForecaster() for name in ('prophet', 'arima', 'lstm')}
+        forecasters['lstm'].neural_model = self.neural_model
+        members = {
+            'prophet': lambda: forecasters['prophet'].forecast_prophet(data, periods, lean=lean, seasonality=seasonality),
+            'arima': lambda: forecasters['arima'].forecast_arima(data, order=arima_order, periods=periods),
+            'lstm': lambda: forecasters['lstm'].forecast_lstm(data, periods=periods)
+        }
+        results, member_seconds, dropped = run_members(members, member_timeout)
+        
+        if not results:
+            raise RuntimeError(f"No ensemble member finished: {dropped}")
+        if 'prophet' in results:
+            self.prophet_model = forecasters['prophet'].prophet_model
+        if 'arima' in results:
+            self.arima_model = forecasters['arima'].arima_model
+            self.arima_results = forecasters['arima'].arima_results
+            self.arima_order = forecasters['arima'].arima_order
+        
+        member_forecasts = {}
+        if 'prophet' in results:
+            if lean:
+                member_forecasts['prophet'] = results['prophet']['yhat']
+            else:
+                member_forecasts['prophet'] = results['prophet']['forecast']['yhat'].tail(periods).values
+        if 'arima' in results:
+            member_forecasts['arima'] = results['arima']['forecast']['forecast'].values
+        if 'lstm' in results:
+            member_forecasts['lstm'] = results['lstm']['forecast']['forecast'].values
         
-        ensemble_forecast = (prophet_forecast + arima_forecast + lstm_forecast) / 3
+        # Combine forecasts (weighted by inverse backtest error)
+        errors = member_errors if member_errors is not None else self.member_errors
+        weights = inverse_error_weights(errors, list(member_forecasts))
+        ensemble_forecast = sum(weights[name] * values for name, values in member_forecasts.items())
         
         last_date = data.iloc[-1, 0]
         forecast_dates = pd.date_range(start=last_date, periods=periods+1, freq='D')[1:]
@@ -193,34 +487,100 @@ class DemandForecaster:
         ensemble_df = pd.DataFrame({
             'date': forecast_dates,
             'ensemble_forecast': ensemble_forecast,
-            'prophet_forecast': prophet_forecast,
-            'arima_forecast': arima_forecast,
-            'lstm_forecast': lstm_forecast
+            **{f"{name}_forecast": values for name, values in member_forecasts.items()}
         })
         
         return {
             'forecast': ensemble_df,
-            'individual_results': {
-                'prophet': prophet_result,
-                'arima': arima_result,
-                'lstm': lstm_result
-            }
+            'weights': weights,
+            'dropped': dropped,
+            'member_seconds': member_seconds,
+            'individual_results': results
         }
     
-    def calculate_accuracy(self, actual: np.ndarray, predicted: np.ndarray) -> Dict:
+    def forecast(
+        self,
+        data: pd.DataFrame,
+        model_type: str = 'prophet',
+        periods: int = 30,
+        seasonality: Optional[Dict[str, bool]] = None,
+        **model_kwargs
+    ) -> pd.DataFrame:
+        """
+        Run one model and return its horizon in a common layout.
+        
+        Args:
+            data: DataFrame with date and value columns
+            model_type: One of MODEL_TYPES
+            periods: Number of periods to forecast
+            seasonality: Seasonal terms for models that fit them, from the
+                seasonality detector; ignored by the others
+            **model_kwargs: Passed on to forecast_prophet or forecast_arima;
+                an ensemble takes 'order' for its ARIMA member
+        
+        Returns:
+            DataFrame with date, forecast, lower_bound and upper_bound
+            (bounds are NaN for models without intervals)
+        """
+        if model_type == 'prophet':
+            forecast = self.forecast_prophet(data, periods, lean=True, seasonality=seasonality, **model_kwargs)
+            return pd.DataFrame({
+                'date': forecast['dates'],
+                'forecast': forecast['yhat'],
+                'lower_bound': forecast['yhat_lower'],
+                'upper_bound': forecast['yhat_upper']
+            })
+        if model_type == 'arima':
+            return self.forecast_arima(data, periods=periods, **model_kwargs)['forecast'].reset_index(drop=True)
+        if model_type == 'holt_winters':
+            seasonal = seasonality['weekly'] if seasonality is not None else True
+            return self.forecast_holt_winters(data, periods, seasonal=seasonal)['forecast']
+        if model_type == 'lstm':
+            forecast = self.forecast_lstm(data, periods=periods)['forecast']
+        elif model_type in INTERMITTENT_METHODS:
+            forecast = self.forecast_intermittent(data, periods, method=model_type)['forecast']
+        elif model_type == 'ensemble':
+            forecast = self.ensemble_forecast(
+                data, periods, lean=True, seasonality=seasonality, arima_order=model_kwargs.get('order')
+            )['forecast'].rename(columns={'ensemble_forecast': 'forecast'})
+        else:
+            raise ValueError(f"Unknown model_type '{model_type}', expected one of {self.MODEL_TYPES}")
+        
+        return pd.DataFrame({
+            'date': forecast['date'].values,
+            'forecast': forecast['forecast'].values,
+            'lower_bound': np.nan,
+            'upper_bound': np.nan
+        })
+    
+    def calculate_accuracy(self, actual: np.ndarray, predicted: np.ndarray, axis: Optional[int] = None) -> Dict:
         """
         Calculate forecast accuracy metrics.
         
         Args:
             actual: Actual values
-            predicted: Predicted values
+            predicted: Predicted values, same shape as actual
+            axis: Axis to average over; None scores everything as one
+                sample, axis=0 on (windows, horizon) arrays scores each step
         
         Returns:
-            Dictionary with accuracy metrics
+            Dictionary with accuracy metrics (scalars, or arrays when axis is set).
+            MAPE leaves out zero actuals, where a percentage error is undefined,
+            and is NaN when every actual is zero.
         """
-        mape = mean_absolute_percentage_error(actual, predicted) * 100
-        rmse = np.sqrt(mean_squared_error(actual, predicted))
-        mae = np.mean(np.abs(actual - predicted))
+        actual = np.asarray(actual, dtype=np.float64)
+        predicted = np.asarray(predicted, dtype=np.float64)
+        errors = actual - predicted
+        
+        nonzero = actual != 0
+        percentage = np.abs(errors) / np.where(nonzero, np.abs(actual), 1.0)
+        counts = np.sum(nonzero, axis=axis)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mape = np.where(counts > 0, np.sum(percentage * nonzero, axis=axis) / counts, np.nan) * 100
+        if axis is None:
+            mape = float(mape)
+        rmse = np.sqrt(np.mean(errors ** 2, axis=axis))
+        mae = np.mean(np.abs(errors), axis=axis)
         
         return {
             'mape': mape,
@@ -232,30 +592,24 @@ class DemandForecaster:
         """
         Detect seasonality patterns in data.
         
+        One-series case of ``detect_seasonality_batch``; use that directly
+        to analyse many aligned series in one FFT.
+        
         Args:
             data: DataFrame with time series data
         
         Returns:
             Dictionary with seasonality information
         """
-        values = data.iloc[:, 1].values
-        
-        # Simple seasonality detection using autocorrelation
-        from statsmodels.tsa.stattools import acf
-        
-        acf_values = acf(values, nlags=min(365, len(values) - 1))
-        
-        # Find peaks in ACF
-        peaks = []
-        for i in range(1, len(acf_values) - 1):
-            if acf_values[i] > acf_values[i-1] and acf_values[i] > acf_values[i+1]:
-                if acf_values[i] > 0.3:  # Threshold for significant correlation
-                    peaks.append(i)
+        values = data.iloc[:, 1].to_numpy(dtype=np.float64)
+        result = detect_seasonality_batch(values[None, :])
+        periods = result['periods'][0]
         
         return {
-            'has_seasonality': len(peaks) > 0,
-            'seasonal_periods': peaks[:5],  # Top 5 seasonal periods
-            'acf_values': acf_values
+            'has_seasonality': bool(result['has_seasonality'][0]),
+            'seasonal_periods': [int(round(p)) for p in periods[~np.isnan(periods)]],
+            'weekly_strength': float(result['weekly'][0]),
+            'yearly_strength': float(result['yearly'][0])
         }
 
 
@@ -0,0 +1,267 @@
+"""
+Batch pick-route solving across a process pool
+"""
+import time
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from models.optimization.route_optimizer import RouteOptimizer
+
+
+def nearest_neighbor_route(distance_matrix: np.ndarray, start: int, end: int) -> List[int]:
+    """Greedy tour from ``start`` through every other node, finishing at ``end``."""
+    n = len(distance_matrix)
+    remaining = np.ones(n, dtype=bool)
+    remaining[[start, end]] = False
+    order = [start]
+    current = start
+
+    while remaining.any():
+        candidates = np.flatnonzero(remaining)
+        current = int(candidates[np.argmin(distance_matrix[current, candidates])])
+        remaining[current] = False
+        order.append(current)
+
+    order.append(end)
+    return order
+
+
+def two_opt(distance_matrix: np.ndarray, order: List[int], time_limit_seconds: float = 1.0) -> List[int]:
+    """
+    Best-improvement 2-opt with fixed endpoints.
+
+    Every candidate reversal is scored at once: reversing ``route[i+1:j+1]``
+    replaces edges (a_i, a_i+1) and (a_j, a_j+1) with (a_i, a_j) and
+    (a_i+1, a_j+1). Assumes a symmetric distance matrix.
+    """
+    route = np.asarray(order, dtype=np.int64)
+    if len(route) < 4:
+        return route.tolist()
+
+    deadline = time.perf_counter() + time_limit_seconds
+    while time.perf_counter() < deadline:
+        a, b = route[:-1], route[1:]
+        current = distance_matrix[a, b]
+        delta = (
+            distance_matrix[a[:, None], a[None, :]]
+            + distance_matrix[b[:, None], b[None, :]]
+            - current[:, None]
+            - current[None, :]
+        )
+        delta = np.triu(delta, k=1)
+        i, j = np.unravel_index(np.argmin(delta), delta.shape)
+        if delta[i, j] >= 0:
+            break
+        route[i + 1:j + 1] = route[i + 1:j + 1][::-1].copy()
+
+    return route.tolist()
+
+
+def heuristic_route(
+    optimizer: RouteOptimizer,
+    start_location: Tuple[int, int],
+    pick_locations: List[Tuple[int, int]],
+    end_location: Optional[Tuple[int, int]] = None,
+    time_limit_seconds: float = 1.0
+) -> Dict:
+    """
+    Route a small order with nearest-neighbor construction plus 2-opt.
+
+    Returns the same fields as ``RouteOptimizer.optimize_picking_route``.
+    """
+    if end_location is None:
+        end_location = start_location
+
+    all_locations = [start_location] + list(pick_locations) + [end_location]
+    distance_matrix = optimizer.create_distance_matrix(all_locations)
+    order = nearest_neighbor_route(distance_matrix, 0, len(all_locations) - 1)
+    order = two_opt(distance_matrix, order, time_limit_seconds)
+    route_distance = int(distance_matrix[order[:-1], order[1:]].sum())
+
+    return {
+        'route': [all_locations[node] for node in order],
+        'total_distance': route_distance,
+        'num_locations': len(pick_locations),
+        'estimated_time_seconds': route_distance * 5,  # Assume 5 seconds per unit distance
+        'optimization_status': 'success'
+    }
+
+
+def solve_order(
+    optimizer: RouteOptimizer,
+    order: Dict,
+    time_budget: float = 1.0,
+    small_order_threshold: int = 12
+) -> Dict:
+    """
+    Route one order, picking the heuristic or OR-Tools path by size.
+
+    Args:
+        optimizer: Route optimizer for the order's warehouse layout
+        order: Dict with pick_locations, start_location and optionally
+            order_id, end_location and time_limit_seconds
+        time_budget: Default time limit when the order does not set one
+        small_order_threshold: Orders with at most this many picks use the heuristic
+
+    Returns:
+        Route result tagged with order_id, solver and elapsed_seconds
+    """
+    started = time.perf_counter()
+    picks = [tuple(p) for p in order['pick_locations']]
+    start = tuple(order['start_location'])
+    end = tuple(order['end_location']) if order.get('end_location') is not None else None
+    time_limit = order.get('time_limit_seconds') or time_budget
+
+    if len(picks) <= small_order_threshold:
+        result = heuristic_route(optimizer, start, picks, end, time_limit_seconds=time_limit)
+        result['solver'] = 'heuristic'
+    else:
+        result = optimizer.optimize_picking_route(start, picks, end, time_limit_seconds=time_limit)
+        result['solver'] = 'ortools'
+
+    result['order_id'] = order.get('order_id')
+    result['elapsed_seconds'] = time.perf_counter() - started
+    return result
+
+
+# Worker-side optimizers keyed by layout, so a long-lived pool can serve several warehouses
+_worker_optimizers: "OrderedDict[Tuple, RouteOptimizer]" = OrderedDict()
+_WORKER_LAYOUTS = 8
+
+
+def _worker_optimizer(layout: Tuple) -> RouteOptimizer:
+    """Build one optimizer per layout and worker process so the distance oracle is shared by its orders."""
+    optimizer = _worker_optimizers.get(layout)
+    if optimizer is None:
+        grid_width, grid_height, obstacles, pick_faces, layout_version, cache_dir = layout
+        optimizer = RouteOptimizer(grid_width, grid_height, layout_version=layout_version, cache_dir=cache_dir)
+        for x, y in obstacles:
+            optimizer.add_obstacle(x, y)
+        if pick_faces:
+            optimizer.set_pick_faces(list(pick_faces))
+        _worker_optimizers[layout] = optimizer
+        if len(_worker_optimizers) > _WORKER_LAYOUTS:
+            _worker_optimizers.popitem(last=False)
+    _worker_optimizers.move_to_end(layout)
+    return optimizer
+
+
+def _solve_in_worker(layout: Tuple, order: Dict, time_budget: float, small_order_threshold: int) -> Dict:
+    return solve_order(_worker_optimizer(layout), order, time_budget, small_order_threshold)
+
+
+def create_route_pool(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """Process pool that ``BatchRouter`` instances can share; the caller owns its shutdown."""
+    return ProcessPoolExecutor(max_workers=max_workers)
+
+
+class BatchRouter:
+    """
+    Route many pick lists in parallel.
+
+    Orders are spread over a process pool, each with its own time budget,
+    and results are yielded in completion order so callers can stream them.
+    A failing order is reported as failed without stopping the batch.
+
+    Pass ``pool`` (see ``create_route_pool``) to share one long-lived pool
+    between batches, e.g. across API requests; otherwise each ``solve``
+    call starts and stops a pool of its own.
+    """
+
+    def __init__(
+        self,
+        grid_width: int,
+        grid_height: int,
+        obstacles: Iterable[Tuple[int, int]] = (),
+        pick_faces: Iterable[Tuple[int, int]] = (),
+        layout_version: Optional[str] = None,
+        cache_dir: Optional[str] = None,
+        time_budget_per_order: float = 1.0,
+        small_order_threshold: int = 12,
+        max_workers: Optional[int] = None,
+        pool: Optional[ProcessPoolExecutor] = None
+    ):
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.obstacles = sorted(set(obstacles))
+        self.pick_faces = list(pick_faces)
+        self.layout_version = layout_version
+        self.cache_dir = cache_dir
+        self.time_budget_per_order = time_budget_per_order
+        self.small_order_threshold = small_order_threshold
+        self.max_workers = max_workers
+        self.pool = pool
+
+    def solve(self, orders: Iterable[Dict]) -> Iterator[Dict]:
+        """
+        Solve orders and yield each result as soon as it is ready.
+
+        Args:
+            orders: Dicts accepted by ``solve_order``
+
+        Yields:
+            Route results in completion order
+        """
+        layout = (
+            self.grid_width,
+            self.grid_height,
+            tuple(self.obstacles),
+            tuple(self.pick_faces),
+            self.layout_version,
+            self.cache_dir
+        )
+        pool = self.pool or create_route_pool(self.max_workers)
+        futures = {}
+        try:
+            futures = {
+                pool.submit(_solve_in_worker, layout, order, self.time_budget_per_order, self.small_order_threshold): order
+                for order in orders
+            }
+            for future in as_completed(futures):
+                try:
+                    yield future.result()
+                except Exception as exc:
+                    yield {
+                        'order_id': futures[future].get('order_id'),
+                        'route': [],
+                        'total_distance': 0,
+                        'optimization_status': 'failed',
+                        'error': str(exc)
+                    }
+        finally:
+            # Stop queued orders if the consumer goes away mid-stream; a shared pool stays up
+            for future in futures:
+                future.cancel()
+            if pool is not self.pool:
+                pool.shutdown(wait=True, cancel_futures=True)
+
+    def solve_all(self, orders: Iterable[Dict]) -> List[Dict]:
+        """Solve orders and return every result."""
+        return list(self.solve(orders))
+
+
+# Example usage
+if __name__ == "__main__":
+    rng = np.random.default_rng(42)
+    orders = [
+        {
+            'order_id': f"ORD-{i:04d}",
+            'start_location': (0, 0),
+            'pick_locations': [tuple(p) for p in rng.integers(0, [50, 30], size=(int(rng.integers(2, 30)), 2)).tolist()]
+        }
+        for i in range(200)
+    ]
+
+    router = BatchRouter(grid_width=50, grid_height=30, time_budget_per_order=0.2, small_order_threshold=20)
+    started = time.perf_counter()
+    results = router.solve_all(orders)
+    elapsed = time.perf_counter() - started
+
+    by_solver = {}
+    for result in results:
+        by_solver[result.get('solver', 'failed')] = by_solver.get(result.get('solver', 'failed'), 0) + 1
+    print(f"Routed {len(results)} orders in {elapsed:.1f}s ({len(results) / elapsed:.0f} orders/s)")
+    print(f"Solver mix: {by_solver}")
+    print(f"Total distance: {sum(r['total_distance'] for r in results)}")
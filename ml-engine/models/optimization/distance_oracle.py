@@ -0,0 +1,173 @@
+"""
+Obstacle-aware shortest-path distances on the warehouse grid
+"""
+import hashlib
+import os
+import numpy as np
+from collections import OrderedDict
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import shortest_path
+from typing import Iterable, Optional, Sequence, Tuple
+
+
+def grid_graph(grid_width: int, grid_height: int, obstacles: Iterable[Tuple[int, int]] = ()) -> csr_matrix:
+    """4-connected adjacency between free cells, indexed row-major (y * width + x)."""
+    n_cells = grid_width * grid_height
+    free = np.ones(n_cells, dtype=bool)
+    for x, y in obstacles:
+        if 0 <= x < grid_width and 0 <= y < grid_height:
+            free[y * grid_width + x] = False
+
+    cells = np.arange(n_cells)
+    right = cells[(cells % grid_width) < grid_width - 1]
+    down = cells[cells < n_cells - grid_width]
+    src = np.concatenate((right, down))
+    dst = np.concatenate((right + 1, down + grid_width))
+    keep = free[src] & free[dst]
+    src, dst = src[keep], dst[keep]
+
+    return csr_matrix(
+        (np.ones(2 * len(src)), (np.concatenate((src, dst)), np.concatenate((dst, src)))),
+        shape=(n_cells, n_cells)
+    )
+
+
+class GridDistanceOracle:
+    """
+    Answer walking-distance queries between grid cells around obstacles.
+
+    Distances between registered pick faces come from an all-pairs table
+    computed once per layout version, written to ``cache_dir`` and
+    memory-mapped on later loads. Other cells fall back to BFS rows that are
+    kept in a small LRU cache. Unreachable pairs get ``UNREACHABLE``.
+    """
+
+    UNREACHABLE = 1_000_000_000
+    SOURCE_BATCH = 256
+
+    def __init__(
+        self,
+        grid_width: int,
+        grid_height: int,
+        obstacles: Iterable[Tuple[int, int]] = (),
+        layout_version: Optional[str] = None,
+        cache_dir: Optional[str] = None,
+        max_cached_rows: int = 256
+    ):
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.obstacles = sorted(set(obstacles))
+        self.cache_dir = cache_dir
+        self.max_cached_rows = max_cached_rows
+
+        digest = hashlib.sha1(f"{grid_width}x{grid_height}:{self.obstacles}".encode()).hexdigest()[:16]
+        self.layout_version = f"{layout_version}-{digest}" if layout_version else digest
+
+        self.graph = grid_graph(grid_width, grid_height, self.obstacles)
+        self.face_index = np.full(grid_width * grid_height, -1, dtype=np.int64)
+        self.faces: Optional[np.ndarray] = None
+        self.table: Optional[np.ndarray] = None
+        self._rows: OrderedDict = OrderedDict()
+
+    def cells(self, locations: Sequence[Tuple[int, int]]) -> np.ndarray:
+        """Row-major cell index for (x, y) locations inside the grid."""
+        xy = np.asarray(locations, dtype=np.int64).reshape(-1, 2)
+        xs, ys = xy[:, 0], xy[:, 1]
+        if (xs < 0).any() or (xs >= self.grid_width).any() or (ys < 0).any() or (ys >= self.grid_height).any():
+            raise ValueError("Locations must lie inside the warehouse grid")
+        return ys * self.grid_width + xs
+
+    def precompute(self, pick_faces: Sequence[Tuple[int, int]]) -> 'GridDistanceOracle':
+        """
+        Build (or load) the all-pairs table between pick faces.
+
+        Args:
+            pick_faces: (x, y) cells pickers stop at
+        """
+        faces = np.unique(self.cells(pick_faces))
+        digest = hashlib.sha1(faces.tobytes()).hexdigest()[:16]
+        path = os.path.join(self.cache_dir, f"{self.layout_version}-{digest}.npy") if self.cache_dir else None
+
+        if path and os.path.exists(path):
+            table = np.load(path, mmap_mode='r')
+        else:
+            table = self._bfs(faces)[:, faces]
+            if path:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    np.save(f, table)
+                os.replace(tmp_path, path)
+                table = np.load(path, mmap_mode='r')
+
+        self.faces = faces
+        self.table = table
+        self.face_index[:] = -1
+        self.face_index[faces] = np.arange(len(faces))
+        return self
+
+    def matrix(self, locations: Sequence[Tuple[int, int]]) -> np.ndarray:
+        """
+        Distance matrix between all locations.
+
+        Pairs of pick faces are a table lookup; rows for any other location
+        come from (cached) BFS.
+        """
+        cells = self.cells(locations)
+        n = len(cells)
+        result = np.empty((n, n), dtype=np.int64)
+
+        idx = self.face_index[cells]
+        known = idx >= 0
+        if known.any():
+            result[np.ix_(known, known)] = self.table[np.ix_(idx[known], idx[known])]
+
+        unknown = np.flatnonzero(~known)
+        if len(unknown):
+            rows = self.distances_from(cells[unknown])[:, cells]
+            result[unknown, :] = rows
+            result[:, unknown] = rows.T
+
+        return result
+
+    def pair_distances(self, from_locations: Sequence[Tuple[int, int]], to_locations: Sequence[Tuple[int, int]]) -> np.ndarray:
+        """Distance between matching pairs of locations, one BFS batch of origins at a time."""
+        sources = self.cells(from_locations)
+        targets = self.cells(to_locations)
+        unique_sources, inverse = np.unique(sources, return_inverse=True)
+        inverse = inverse.ravel()
+        result = np.empty(len(sources), dtype=np.int64)
+
+        for start in range(0, len(unique_sources), self.SOURCE_BATCH):
+            batch = unique_sources[start:start + self.SOURCE_BATCH]
+            rows = self.distances_from(batch)
+            pairs = np.flatnonzero((inverse >= start) & (inverse < start + len(batch)))
+            result[pairs] = rows[inverse[pairs] - start, targets[pairs]]
+
+        return result
+
+    def distances_from(self, cells: np.ndarray) -> np.ndarray:
+        """Distance rows (len(cells), grid cells) for source cells, LRU-cached."""
+        cells = np.asarray(cells, dtype=np.int64)
+        missing = [int(c) for c in np.unique(cells) if int(c) not in self._rows]
+        if missing:
+            fresh = self._bfs(np.array(missing))
+            for cell, row in zip(missing, fresh):
+                self._rows[cell] = row
+
+        rows = np.stack([self._rows[int(c)] for c in cells]) if len(cells) else np.empty((0, self.graph.shape[0]), dtype=np.int32)
+        for c in cells.tolist():
+            self._rows.move_to_end(c)
+        while len(self._rows) > max(self.max_cached_rows, len(cells)):
+            self._rows.popitem(last=False)
+        return rows
+
+    def _bfs(self, sources: np.ndarray) -> np.ndarray:
+        """Unweighted shortest paths from each source to every cell, as int32."""
+        rows = np.empty((len(sources), self.graph.shape[0]), dtype=np.int32)
+        for start in range(0, len(sources), self.SOURCE_BATCH):
+            batch = sources[start:start + self.SOURCE_BATCH]
+            dist = shortest_path(self.graph, directed=False, unweighted=True, indices=batch)
+            dist[np.isinf(dist)] = self.UNREACHABLE
+            rows[start:start + len(batch)] = dist
+        return rows
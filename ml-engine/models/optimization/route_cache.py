@@ -0,0 +1,243 @@
+"""
+Route result cache keyed by canonical pick sets and layout version
+"""
+import copy
+import hashlib
+import json
+import numpy as np
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+Point = Tuple[int, int]
+
+CACHED_ROUTE_QUERY = """
+    SELECT waypoints, total_distance, estimated_time
+    FROM routes
+    WHERE warehouse_id = :warehouse_id
+      AND route_name = :route_name
+    ORDER BY created_at DESC
+    LIMIT 1
+"""
+
+INSERT_ROUTE_QUERY = """
+    INSERT INTO routes (
+        warehouse_id, route_name, route_type,
+        start_x, start_y, end_x, end_y,
+        waypoints, total_distance, estimated_time
+    )
+    VALUES (
+        :warehouse_id, :route_name, 'picking',
+        :start_x, :start_y, :end_x, :end_y,
+        CAST(:waypoints AS JSONB), :total_distance, :estimated_time
+    )
+"""
+
+
+def _point(location: Sequence[int]) -> Point:
+    # Rounded, not truncated: 2.9999999 from a float round trip is still cell 3
+    return int(round(location[0])), int(round(location[1]))
+
+
+def warm_start_order(cached_route: List[Point], all_locations: List[Point], distance_matrix: np.ndarray) -> List[int]:
+    """
+    Turn a cached tour into a visiting order for a new, overlapping pick list.
+
+    Picks shared with the cached tour keep its order; new picks are placed
+    by cheapest insertion. ``all_locations`` is [start] + picks + [end] and
+    the returned node indices cover only the picks.
+
+    Returns:
+        Node indices (into ``all_locations``) in visiting order
+    """
+    end_node = len(all_locations) - 1
+    free: Dict[Point, List[int]] = {}
+    for node in range(1, end_node):
+        free.setdefault(_point(all_locations[node]), []).append(node)
+
+    order = []
+    for location in cached_route[1:-1]:
+        nodes = free.get(_point(location))
+        if nodes:
+            order.append(nodes.pop(0))
+
+    for node in [n for nodes in free.values() for n in nodes]:
+        path = np.array([0] + order + [end_node])
+        cost = distance_matrix[path[:-1], node] + distance_matrix[node, path[1:]] - distance_matrix[path[:-1], path[1:]]
+        order.insert(int(np.argmin(cost)), node)
+
+    return order
+
+
+class RouteCache:
+    """
+    LRU cache of solved picking routes.
+
+    Entries are keyed on (start, sorted picks, end, layout key), so any
+    permutation of the same pick list is an exact hit and a layout or
+    obstacle change is always a miss. ``closest`` finds the cached route
+    sharing the most picks with a new list so the solver can start from it.
+
+    When an SQLAlchemy ``engine`` and ``warehouse_id`` are given, solved
+    routes are also written to the ``routes`` table and memory misses fall
+    back to it.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        min_overlap: float = 0.5,
+        warm_start_time_fraction: float = 0.25,
+        engine=None,
+        warehouse_id: Optional[str] = None
+    ):
+        self.max_entries = max_entries
+        self.min_overlap = min_overlap
+        self.warm_start_time_fraction = warm_start_time_fraction
+        self.engine = engine
+        self.warehouse_id = warehouse_id
+        self.entries: OrderedDict = OrderedDict()
+        self.pick_index: Dict[Tuple[str, Point], Set[str]] = {}
+        self.hits = 0
+        self.partial_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def endpoint_key(start: Point, end: Point, layout_key: str) -> str:
+        """Key shared by every pick list routed between the same endpoints on one layout."""
+        return f"{layout_key}:{_point(start)}:{_point(end)}"
+
+    @classmethod
+    def key(cls, start: Point, picks: List[Point], end: Point, layout_key: str) -> str:
+        """Canonical cache key; pick order does not matter."""
+        canonical = f"{cls.endpoint_key(start, end, layout_key)}:{sorted(_point(p) for p in picks)}"
+        return hashlib.sha1(canonical.encode()).hexdigest()
+
+    def get(self, start: Point, picks: List[Point], end: Point, layout_key: str) -> Optional[Dict]:
+        """Cached result for exactly this pick set, or None."""
+        key = self.key(start, picks, end, layout_key)
+        entry = self.entries.get(key)
+        if entry is None and self.engine is not None:
+            entry = self._load(key, start, picks, end, layout_key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        result = copy.deepcopy(entry['result'])
+        result['cache_status'] = 'hit'
+        return result
+
+    def closest(self, start: Point, picks: List[Point], end: Point, layout_key: str) -> Optional[List[Point]]:
+        """
+        Route of the cached entry sharing the most picks with ``picks``.
+
+        Only entries with the same endpoints and layout are considered, and
+        at least ``min_overlap`` of the new picks must be shared.
+        """
+        prefix = self.endpoint_key(start, end, layout_key)
+        wanted = Counter(_point(p) for p in picks)
+        candidates: Set[str] = set()
+        for pick in wanted:
+            candidates |= self.pick_index.get((prefix, pick), set())
+        if not candidates:
+            return None
+
+        def shared(key: str) -> int:
+            return sum((wanted & self.entries[key]['picks']).values())
+
+        best = max(candidates, key=shared)
+        if shared(best) < self.min_overlap * len(picks):
+            return None
+
+        self.entries.move_to_end(best)
+        self.partial_hits += 1
+        return list(self.entries[best]['result']['route'])
+
+    def put(self, start: Point, picks: List[Point], end: Point, layout_key: str, result: Dict, persist: bool = True):
+        """Store a successful result and evict the least recently used entries."""
+        if result.get('optimization_status') != 'success':
+            return
+
+        key = self.key(start, picks, end, layout_key)
+        self._insert(key, start, picks, end, layout_key, result)
+        if persist and self.engine is not None:
+            self._save(key, start, end, result)
+
+    def stats(self) -> Dict:
+        """Entry count and hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'partial_hits': self.partial_hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+    def _insert(self, key: str, start: Point, picks: List[Point], end: Point, layout_key: str, result: Dict):
+        if key in self.entries:
+            self._evict(key)
+
+        result = {k: v for k, v in result.items() if k != 'cache_status'}
+        prefix = self.endpoint_key(start, end, layout_key)
+        pick_counts = Counter(_point(p) for p in picks)
+        self.entries[key] = {
+            'prefix': prefix,
+            'picks': pick_counts,
+            'result': copy.deepcopy(result)
+        }
+        for pick in pick_counts:
+            self.pick_index.setdefault((prefix, pick), set()).add(key)
+
+        while len(self.entries) > self.max_entries:
+            self._evict(next(iter(self.entries)))
+
+    def _evict(self, key: str):
+        entry = self.entries.pop(key)
+        for pick in entry['picks']:
+            keys = self.pick_index.get((entry['prefix'], pick))
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.pick_index[(entry['prefix'], pick)]
+
+    def _load(self, key: str, start: Point, picks: List[Point], end: Point, layout_key: str) -> Optional[Dict]:
+        from sqlalchemy import text
+
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                text(CACHED_ROUTE_QUERY),
+                {'warehouse_id': self.warehouse_id, 'route_name': f"route-cache:{key}"}
+            ).first()
+        if row is None:
+            return None
+
+        waypoints = row.waypoints if isinstance(row.waypoints, list) else json.loads(row.waypoints)
+        total_distance = int(row.total_distance)
+        result = {
+            'route': [(int(p['x']), int(p['y'])) for p in waypoints],
+            'total_distance': total_distance,
+            'num_locations': len(picks),
+            'estimated_time_seconds': row.estimated_time if row.estimated_time is not None else total_distance * 5,
+            'optimization_status': 'success'
+        }
+        self._insert(key, start, picks, end, layout_key, result)
+        return self.entries[key]
+
+    def _save(self, key: str, start: Point, end: Point, result: Dict):
+        from sqlalchemy import text
+
+        with self.engine.begin() as conn:
+            conn.execute(text(INSERT_ROUTE_QUERY), {
+                'warehouse_id': self.warehouse_id,
+                'route_name': f"route-cache:{key}",
+                'start_x': int(start[0]),
+                'start_y': int(start[1]),
+                'end_x': int(end[0]),
+                'end_y': int(end[1]),
+                'waypoints': json.dumps([{'x': int(x), 'y': int(y)} for x, y in result['route']]),
+                'total_distance': result['total_distance'],
+                'estimated_time': int(result.get('estimated_time_seconds', 0))
+            })
@@ -1,61 +1,109 @@
 """
 Route Optimization using Google OR-Tools
 """
+import hashlib
 import numpy as np
 from ortools.constraint_solver import routing_enums_pb2
 from ortools.constraint_solver import pywrapcp
-from typing import List, Tuple, Dict
+from typing import List, Optional, Tuple, Dict
+
+from models.optimization.distance_oracle import GridDistanceOracle
+from models.optimization.route_cache import RouteCache, warm_start_order
 
 
 class RouteOptimizer:
     """Optimize warehouse routes using OR-Tools."""
     
-    def __init__(self, grid_width: int, grid_height: int):
+    def __init__(
+        self,
+        grid_width: int,
+        grid_height: int,
+        layout_version: Optional[str] = None,
+        cache_dir: Optional[str] = None,
+        route_cache: Optional[RouteCache] = None
+    ):
         self.grid_width = grid_width
         self.grid_height = grid_height
         self.obstacles = set()
+        self.layout_version = layout_version
+        self.cache_dir = cache_dir
+        self.route_cache = route_cache
+        self._oracle: Optional[GridDistanceOracle] = None
+        self._pick_faces: List[Tuple[int, int]] = []
     
     def add_obstacle(self, x: int, y: int):
         """Add an obstacle to the warehouse grid."""
         self.obstacles.add((x, y))
+        self._oracle = None
+    
+    def set_pick_faces(self, pick_faces: List[Tuple[int, int]]):
+        """Register the cells pickers stop at so their distances are precomputed."""
+        self._pick_faces = list(pick_faces)
+        self._oracle = None
+    
+    @property
+    def layout_key(self) -> str:
+        """Identifies the grid, obstacles and layout version that distances depend on."""
+        digest = hashlib.sha1(f"{self.grid_width}x{self.grid_height}:{sorted(self.obstacles)}".encode()).hexdigest()[:16]
+        return f"{self.layout_version}-{digest}" if self.layout_version else digest
+    
+    @property
+    def distance_oracle(self) -> GridDistanceOracle:
+        """Obstacle-aware distance oracle for the current layout."""
+        if self._oracle is None:
+            self._oracle = GridDistanceOracle(
+                self.grid_width,
+                self.grid_height,
+                self.obstacles,
+                layout_version=self.layout_version,
+                cache_dir=self.cache_dir
+            )
+            if self._pick_faces:
+                self._oracle.precompute(self._pick_faces)
+        return self._oracle
     
     def manhattan_distance(self, point1: Tuple[int, int], point2: Tuple[int, int]) -> int:
         """Calculate Manhattan distance between two points."""
         return abs(point1[0] - point2[0]) + abs(point1[1] - point2[1])
     
-    def create_distance_matrix(self, locations: List[Tuple[int, int]]) -> List[List[int]]:
+    def create_distance_matrix(self, locations: List[Tuple[int, int]]) -> np.ndarray:
         """
         Create distance matrix for all locations.
         
+        With obstacles on the grid, distances are true walking distances
+        looked up from the distance oracle.
+        
         Args:
             locations: List of (x, y) coordinates
         
         Returns:
-            Distance matrix
+            Distance matrix as an (n, n) int64 array
         """
-        n = len(locations)
-        distance_matrix = [[0] * n for _ in range(n)]
-        
-        for i in range(n):
-            for j in range(n):
-                if i != j:
-                    distance_matrix[i][j] = self.manhattan_distance(locations[i], locations[j])
+        if self.obstacles:
+            return self.distance_oracle.matrix(locations)
         
-        return distance_matrix
+        points = np.asarray(locations, dtype=np.int64).reshape(-1, 2)
+        return np.abs(points[:, None, :] - points[None, :, :]).sum(axis=-1)
     
     def optimize_picking_route(
         self,
         start_location: Tuple[int, int],
         pick_locations: List[Tuple[int, int]],
-        end_location: Tuple[int, int] = None
+        end_location: Tuple[int, int] = None,
+        time_limit_seconds: float = 5
     ) -> Dict:
         """
         Optimize picking route using OR-Tools TSP solver.
         
+        With a route cache attached, a repeated pick set is returned without
+        solving, and a pick list overlapping a cached one starts the search
+        from the cached tour with a shortened time limit.
+        
         Args:
             start_location: Starting point (e.g., packing station)
             pick_locations: List of locations to visit
             end_location: Optional ending point (defaults to start_location)
+            time_limit_seconds: Wall-clock budget for the local search
         
         Returns:
             Dictionary with optimized route and metrics
@@ -63,6 +111,15 @@ class RouteOptimizer:
         if end_location is None:
             end_location = start_location
         
+        cached_route = None
+        if self.route_cache is not None:
+            cached = self.route_cache.get(start_location, pick_locations, end_location, self.layout_key)
+            if cached is not None:
+                return cached
+            cached_route = self.route_cache.closest(start_location, pick_locations, end_location, self.layout_key)
+            if cached_route is not None:
+                time_limit_seconds *= self.route_cache.warm_start_time_fraction
+        
         # Create list of all locations
         all_locations = [start_location] + pick_locations + [end_location]
         
@@ -73,17 +130,13 @@ class RouteOptimizer:
         manager = pywrapcp.RoutingIndexManager(
             len(distance_matrix),
             1,  # Number of vehicles
-            0   # Depot (start location index)
+            [0],  # Start location index
+            [len(distance_matrix) - 1]  # End location index
         )
         routing = pywrapcp.RoutingModel(manager)
         
-        # Create distance callback
-        def distance_callback(from_index, to_index):
-            from_node = manager.IndexToNode(from_index)
-            to_node = manager.IndexToNode(to_index)
-            return distance_matrix[from_node][to_node]
-        
-        transit_callback_index = routing.RegisterTransitCallback(distance_callback)
+        # Register arc costs as a matrix so the solver never calls back into Python
+        transit_callback_index = routing.RegisterTransitMatrix(distance_matrix.tolist())
         routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
         
         # Set search parameters
@@ -94,10 +147,16 @@ class RouteOptimizer:
         search_parameters.local_search_metaheuristic = (
             routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH
         )
-        search_parameters.time_limit.seconds = 5
+        search_parameters.time_limit.FromMilliseconds(max(1, int(time_limit_seconds * 1000)))
         
-        # Solve
-        solution = routing.SolveWithParameters(search_parameters)
+        # Solve, starting from the cached tour when there is one
+        if cached_route is not None:
+            routing.CloseModelWithParameters(search_parameters)
+            order = warm_start_order(cached_route, all_locations, distance_matrix)
+            initial_solution = routing.ReadAssignmentFromRoutes([[manager.NodeToIndex(node) for node in order]], True)
+            solution = routing.SolveFromAssignmentWithParameters(initial_solution, search_parameters)
+        else:
+            solution = routing.SolveWithParameters(search_parameters)
         
         if solution:
             # Extract route
@@ -116,13 +175,17 @@ class RouteOptimizer:
             final_node = manager.IndexToNode(index)
             route.append(all_locations[final_node])
             
-            return {
+            result = {
                 'route': route,
                 'total_distance': route_distance,
                 'num_locations': len(pick_locations),
                 'estimated_time_seconds': route_distance * 5,  # Assume 5 seconds per unit distance
                 'optimization_status': 'success'
             }
+            if self.route_cache is not None:
+                self.route_cache.put(start_location, pick_locations, end_location, self.layout_key, result)
+                result['cache_status'] = 'warm_start' if cached_route is not None else 'miss'
+            return result
         else:
             return {
                 'route': [],
@@ -135,7 +198,8 @@ class RouteOptimizer:
         depot: Tuple[int, int],
         pick_locations: List[Tuple[int, int]],
         num_vehicles: int = 3,
-        vehicle_capacity: int = 20
+        vehicle_capacity: int = 20,
+        time_limit_seconds: float = 10
     ) -> Dict:
         """
         Optimize routes for multiple vehicles with capacity constraints.
@@ -145,6 +209,7 @@ class RouteOptimizer:
             pick_locations: List of pick locations
             num_vehicles: Number of vehicles
             vehicle_capacity: Capacity of each vehicle
+            time_limit_seconds: Wall-clock budget for the search
         
         Returns:
             Dictionary with optimized routes for all vehicles
@@ -166,21 +231,12 @@ class RouteOptimizer:
         )
         routing = pywrapcp.RoutingModel(manager)
         
-        # Create distance callback
-        def distance_callback(from_index, to_index):
-            from_node = manager.IndexToNode(from_index)
-            to_node = manager.IndexToNode(to_index)
-            return distance_matrix[from_node][to_node]
-        
-        transit_callback_index = routing.RegisterTransitCallback(distance_callback)
+        # Register arc costs as a matrix so the solver never calls back into Python
+        transit_callback_index = routing.RegisterTransitMatrix(distance_matrix.tolist())
         routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
         
         # Add capacity constraint
-        def demand_callback(from_index):
-            from_node = manager.IndexToNode(from_index)
-            return demands[from_node]
-        
-        demand_callback_index = routing.RegisterUnaryTransitCallback(demand_callback)
+        demand_callback_index = routing.RegisterUnaryTransitVector(demands)
         routing.AddDimensionWithVehicleCapacity(
             demand_callback_index,
             0,  # null capacity slack
@@ -194,7 +250,7 @@ class RouteOptimizer:
         search_parameters.first_solution_strategy = (
             routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC
         )
-        search_parameters.time_limit.seconds = 10
+        search_parameters.time_limit.FromMilliseconds(max(1, int(time_limit_seconds * 1000)))
         
         # Solve
         solution = routing.SolveWithParameters(search_parameters)
@@ -261,9 +317,12 @@ class RouteOptimizer:
                 'avg_distance_between_stops': 0
             }
         
-        total_distance = 0
-        for i in range(len(route) - 1):
-            total_distance += self.manhattan_distance(route[i], route[i+1])
+        if self.obstacles:
+            total_distance = int(self.distance_oracle.pair_distances(route[:-1], route[1:]).sum())
+        else:
+            total_distance = 0
+            for i in range(len(route) - 1):
+                total_distance += self.manhattan_distance(route[i], route[i+1])
         
         return {
             'total_distance': total_distance,
@@ -0,0 +1,197 @@
+"""
+Dynamic micro-batching of concurrent inference requests
+"""
+import logging
+import queue
+import threading
+import time
+import numpy as np
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceOverloaded(Exception):
+    """The request queue is full; the caller should back off and retry."""
+
+
+class InferenceBatcher:
+    """
+    Gather concurrent requests into batches for one forward pass each.
+
+    ``submit`` queues an item and returns a Future. A single worker thread
+    takes the first waiting item, then keeps collecting until it holds
+    ``max_batch_size`` items or ``max_wait_seconds`` have passed since that
+    first item, calls ``predict_batch`` once on the whole batch and hands
+    each caller its own result. The added latency per request is therefore
+    bounded by ``max_wait_seconds`` plus one batch's inference; under light
+    load a lone request waits out the window and runs as a batch of one.
+
+    ``predict_batch`` must return one result per input, in order. If it
+    raises, every request in that batch gets the exception.
+
+    The worker is the only thread running inference, so callers (e.g. an
+    asyncio event loop awaiting the Future) never block on it. With
+    ``max_queue`` set, ``submit`` rejects new items once that many are
+    waiting instead of letting latency grow without bound. Queue wait and
+    batch inference times of the last ``metrics_window`` requests and
+    batches are kept for ``stats``.
+    """
+
+    def __init__(
+        self,
+        predict_batch: Callable[[List], List],
+        max_batch_size: int = 16,
+        max_wait_seconds: float = 0.01,
+        name: str = 'inference',
+        max_queue: Optional[int] = None,
+        metrics_window: int = 1000
+    ):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self.name = name
+        self.max_queue = max_queue
+        self.batches = 0
+        self.items = 0
+        self.rejected = 0
+        self.failed_batches = 0
+        self.queue_wait_seconds: deque = deque(maxlen=metrics_window)
+        self.inference_seconds: deque = deque(maxlen=metrics_window)
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def submit(self, item) -> Future:
+        """
+        Queue one item; the Future resolves to its result.
+
+        Raises:
+            InferenceOverloaded: ``max_queue`` items are already waiting
+        """
+        if self.max_queue is not None and self._queue.qsize() >= self.max_queue:
+            self.rejected += 1
+            raise InferenceOverloaded(f"{self.name} queue is full ({self.max_queue} waiting)")
+
+        future: Future = Future()
+        self._ensure_worker()
+        self._queue.put((item, future, time.monotonic()))
+        return future
+
+    def stats(self) -> Dict:
+        """Batch and rejection counters, queue length, and queue-wait / inference latency percentiles."""
+        def percentiles(samples: deque) -> Dict:
+            if not samples:
+                return {'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'max_ms': None}
+            values = np.array(samples) * 1000
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            return {'p50_ms': float(p50), 'p95_ms': float(p95), 'p99_ms': float(p99), 'max_ms': float(values.max())}
+
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'mean_batch_size': self.items / self.batches if self.batches else 0.0,
+            'queued': self._queue.qsize(),
+            'max_queue': self.max_queue,
+            'rejected': self.rejected,
+            'failed_batches': self.failed_batches,
+            'queue_wait': percentiles(self.queue_wait_seconds),
+            'inference': percentiles(self.inference_seconds)
+        }
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name=f"{self.name}-batcher", daemon=True)
+                self._worker.start()
+
+    def _collect(self) -> List:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_seconds
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # Callers that gave up (cancelled futures) are dropped before inference
+            batch = [(item, future, queued_at) for item, future, queued_at in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            started = time.monotonic()
+            self.queue_wait_seconds.extend(started - queued_at for _, _, queued_at in batch)
+            try:
+                results = self.predict_batch([item for item, _, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"predict_batch returned {len(results)} results for {len(batch)} items")
+            except Exception as exc:
+                self.failed_batches += 1
+                logger.error(f"{self.name} batch of {len(batch)} failed: {exc}")
+                for _, future, _ in batch:
+                    future.set_exception(exc)
+                continue
+
+            self.inference_seconds.append(time.monotonic() - started)
+            self.batches += 1
+            self.items += len(batch)
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+
+
+# Example usage
+if __name__ == "__main__":
+    from concurrent.futures import ThreadPoolExecutor
+
+    def fake_model(images: List) -> List:
+        # Fixed per-call overhead plus a smaller per-image cost, as with a CNN on CPU
+        time.sleep(0.02 + 0.002 * len(images))
+        return [len(image) for image in images]
+
+    requests = [b'x' * i for i in range(200)]
+
+    def run(submit, clients: int = 32):
+        started = time.perf_counter()
+        latencies = []
+
+        def one(item):
+            t0 = time.perf_counter()
+            submit(item)
+            latencies.append(time.perf_counter() - t0)
+
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            list(pool.map(one, requests))
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        return len(requests) / elapsed, latencies[int(0.99 * (len(latencies) - 1))]
+
+    lock = threading.Lock()
+
+    def unbatched(item):
+        with lock:
+            return fake_model([item])[0]
+
+    batcher = InferenceBatcher(fake_model, max_batch_size=16, max_wait_seconds=0.005)
+    for name, submit in (('one at a time', unbatched), ('micro-batched', lambda item: batcher.submit(item).result())):
+        throughput, p99 = run(submit)
+        print(f"{name:>14}: {throughput:6.1f} images/s, p99 latency {p99 * 1000:6.1f}ms")
+    stats = batcher.stats()
+    print(f"Batcher: {stats['batches']} batches, mean size {stats['mean_batch_size']:.1f}, "
+          f"queue wait p99 {stats['queue_wait']['p99_ms']:.1f}ms, inference p99 {stats['inference']['p99_ms']:.1f}ms")
+
+    bounded = InferenceBatcher(fake_model, max_batch_size=16, max_wait_seconds=0.005, max_queue=8)
+    accepted = []
+    for item in requests:
+        try:
+            accepted.append(bounded.submit(item))
+        except InferenceOverloaded:
+            pass
+    [future.result() for future in accepted]
+    print(f"Burst of {len(requests)} into a queue of 8: {len(accepted)} accepted, {bounded.stats()['rejected']} rejected")
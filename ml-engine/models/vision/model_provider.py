@@ -0,0 +1,139 @@
+"""
+Lazy, warmed-up loading of vision models
+"""
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ModelNotReady(Exception):
+    """The model failed to load or did not finish loading in time."""
+
+
+class ModelProvider:
+    """
+    Load a model once, on first use or in a background warm-up thread.
+
+    Nothing heavy happens at construction, so importing a module that
+    holds a provider stays cheap. ``start_warmup`` loads the model in a
+    daemon thread and runs ``warmup`` on it (e.g. one dummy inference so
+    the first real request does not pay for graph tracing); ``get`` returns
+    the model, loading it in the calling thread if no one has started yet
+    or waiting for the warm-up in progress. ``status`` reports the state
+    for readiness checks: 'idle', 'loading', 'ready' or 'failed'.
+    """
+
+    def __init__(self, factory: Callable[[], object], warmup: Optional[Callable[[object], None]] = None, name: str = 'model'):
+        self.factory = factory
+        self.warmup = warmup
+        self.name = name
+        self.state = 'idle'
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.warmup_seconds: Optional[float] = None
+        self._model = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def start_warmup(self) -> bool:
+        """
+        Load and warm up in a background thread.
+
+        Returns:
+            True if a load was started, False if one is running or finished
+        """
+        if not self._claim():
+            return False
+        threading.Thread(target=self._load, name=f"{self.name}-warmup", daemon=True).start()
+        return True
+
+    def get(self, timeout: Optional[float] = None):
+        """
+        The loaded model.
+
+        Args:
+            timeout: Seconds to wait for a load already in progress (None waits)
+
+        Raises:
+            ModelNotReady: The load failed or did not finish within ``timeout``
+        """
+        if self.state == 'ready':
+            return self._model
+        if self._claim():
+            self._load()
+        elif not self._done.wait(timeout):
+            raise ModelNotReady(f"{self.name} is still loading")
+
+        if self.state != 'ready':
+            raise ModelNotReady(f"{self.name} failed to load: {self.error}")
+        return self._model
+
+    def status(self) -> Dict:
+        """Readiness state and load timings."""
+        return {
+            'state': self.state,
+            'ready': self.state == 'ready',
+            'error': self.error,
+            'load_seconds': self.load_seconds,
+            'warmup_seconds': self.warmup_seconds
+        }
+
+    def _claim(self) -> bool:
+        """Move idle or failed to loading; only the caller that wins runs the load."""
+        with self._lock:
+            if self.state not in ('idle', 'failed'):
+                return False
+            self.state = 'loading'
+            self.error = None
+            self._done.clear()
+            return True
+
+    def _load(self):
+        try:
+            started = time.perf_counter()
+            model = self.factory()
+            self.load_seconds = time.perf_counter() - started
+
+            if self.warmup is not None:
+                started = time.perf_counter()
+                self.warmup(model)
+                self.warmup_seconds = time.perf_counter() - started
+
+            self._model = model
+            self.state = 'ready'
+            logger.info(f"{self.name} ready (load {self.load_seconds:.1f}s, warm-up {self.warmup_seconds or 0:.1f}s)")
+        except Exception as exc:
+            self.error = f"{type(exc).__name__}: {exc}"
+            self.state = 'failed'
+            logger.error(f"{self.name} failed to load: {self.error}")
+        finally:
+            self._done.set()
+
+
+def _load_product_classifier():
+    # TensorFlow is only imported here, when the model is first needed
+    from models.vision.product_classifier import ProductClassifier
+    return ProductClassifier()
+
+
+product_classifier = ModelProvider(
+    _load_product_classifier,
+    warmup=lambda classifier: classifier.warm_up(),
+    name='product_classifier'
+)
+
+
+# Example usage
+if __name__ == "__main__":
+    def slow_model():
+        time.sleep(0.5)
+        return lambda x: x * 2
+
+    provider = ModelProvider(slow_model, warmup=lambda model: model(1), name='demo')
+    print(f"Before warm-up: {provider.status()['state']}")
+    provider.start_warmup()
+    print(f"During warm-up: {provider.status()['state']}")
+    print(f"Result: {provider.get()(21)}, status: {provider.status()}")
@@ -0,0 +1,236 @@
+"""
+Perceptual-hash result cache for repeated product scans
+"""
+import io
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+HASH_SIZE = 16
+THUMBNAIL_SIZE = 8
+
+
+def dhash(img: Image.Image, hash_size: int = HASH_SIZE) -> int:
+    """
+    Difference hash of an image.
+
+    The image is shrunk to (hash_size + 1) x hash_size grayscale and each bit
+    records whether a pixel is brighter than its right-hand neighbour, so
+    re-encoding, small crops, lighting drift and sensor noise flip only a few
+    bits while a different product changes about half of them.
+
+    Args:
+        img: Decoded PIL image
+        hash_size: Rows of the hash grid; the hash has hash_size ** 2 bits
+
+    Returns:
+        Hash as an unsigned integer
+    """
+    # reducing_gap shrinks large photos by cheap integer steps before the final resample
+    small = img.convert('L').resize((hash_size + 1, hash_size), Image.BILINEAR, reducing_gap=2.0)
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def thumbnail(img: Image.Image, size: int = THUMBNAIL_SIZE) -> np.ndarray:
+    """Tiny RGB thumbnail scaled to a mean of 128, so exposure changes between scans cancel out."""
+    small = np.asarray(img.convert('RGB').resize((size, size), Image.BILINEAR, reducing_gap=2.0), dtype=np.float32)
+    return small * (128.0 / max(float(small.mean()), 1.0))
+
+
+def image_signature(img_bytes: bytes, hash_size: int = HASH_SIZE) -> Tuple[int, np.ndarray]:
+    """
+    Hash and thumbnail of encoded image bytes.
+
+    JPEGs are decoded at reduced scale (DCT draft mode), which is all a
+    signature needs and several times cheaper than a full decode.
+
+    Returns:
+        (dhash, thumbnail)
+    """
+    img = Image.open(io.BytesIO(img_bytes))
+    img.draft('RGB', (8 * hash_size, 8 * hash_size))
+    img = img.convert('RGB')
+    return dhash(img, hash_size), thumbnail(img)
+
+
+class PerceptualCache:
+    """
+    Map perceptual hashes to results, matching within a Hamming distance.
+
+    Near-duplicate lookups use a band index: the hash is split into
+    ``max_distance + 1`` bands, and by the pigeonhole principle any hash
+    within ``max_distance`` bits agrees with the query on at least one band
+    exactly. Only entries sharing a band are compared bit by bit, so a lookup
+    costs a handful of dict probes regardless of cache size.
+
+    Different products can still land within ``max_distance`` bits (smooth,
+    low-texture photos give similar gradient hashes), so when a thumbnail
+    is stored with an entry, a match is only served if the query's thumbnail
+    is within ``max_thumbnail_error`` mean absolute difference; near matches
+    that fail this check are counted in ``rejected``.
+
+    Entries expire ``ttl_seconds`` after they were stored and the least
+    recently used one is evicted beyond ``max_entries``. All methods are
+    thread-safe.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 4096,
+        ttl_seconds: Optional[float] = 3600.0,
+        max_distance: int = 10,
+        hash_bits: int = HASH_SIZE ** 2,
+        max_thumbnail_error: float = 8.0
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_distance = max_distance
+        self.hash_bits = hash_bits
+        self.max_thumbnail_error = max_thumbnail_error
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.rejected = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries: 'OrderedDict[int, Tuple[Any, float, Optional[np.ndarray]]]' = OrderedDict()
+        self._band_width = -(-hash_bits // (max_distance + 1))
+        self._bands: List[Dict[int, set]] = [{} for _ in range(max_distance + 1)]
+        self._lock = threading.Lock()
+
+    def get(self, key: int, thumb: Optional[np.ndarray] = None) -> Optional[Any]:
+        """
+        Result stored under the nearest hash within ``max_distance`` whose thumbnail matches.
+
+        Args:
+            key: Query hash
+            thumb: Query thumbnail (see ``thumbnail``); skips verification when None
+
+        Returns:
+            The cached result, or None on a miss
+        """
+        now = time.monotonic()
+        with self._lock:
+            match = None
+            for distance, candidate in self._candidates(key):
+                if self._expired(candidate, now):
+                    self._remove(candidate)
+                    self.expirations += 1
+                    continue
+                stored_thumb = self._entries[candidate][2]
+                if thumb is not None and stored_thumb is not None and \
+                        float(np.abs(stored_thumb - thumb).mean()) > self.max_thumbnail_error:
+                    self.rejected += 1
+                    continue
+                match = candidate
+                break
+
+            if match is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            if match != key:
+                self.near_hits += 1
+            self._entries.move_to_end(match)
+            return self._entries[match][0]
+
+    def put(self, key: int, value: Any, thumb: Optional[np.ndarray] = None):
+        """Store a result, evicting the least recently used entry when full."""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.monotonic(), thumb)
+            for band, index in zip(self._band_values(key), self._bands):
+                index.setdefault(band, set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'near_hits': self.near_hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'rejected': self.rejected,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
+
+    def _band_values(self, key: int) -> List[int]:
+        mask = (1 << self._band_width) - 1
+        return [(key >> (i * self._band_width)) & mask for i in range(len(self._bands))]
+
+    def _candidates(self, key: int) -> List[Tuple[int, int]]:
+        """Stored hashes within ``max_distance`` of ``key`` as (distance, hash), nearest first."""
+        candidates = set()
+        for band, index in zip(self._band_values(key), self._bands):
+            candidates |= index.get(band, set())
+        within = [((candidate ^ key).bit_count(), candidate) for candidate in candidates]
+        return sorted(pair for pair in within if pair[0] <= self.max_distance)
+
+    def _expired(self, key: int, now: float) -> bool:
+        return self.ttl_seconds is not None and now - self._entries[key][1] > self.ttl_seconds
+
+    def _remove(self, key: int):
+        del self._entries[key]
+        for band, index in zip(self._band_values(key), self._bands):
+            keys = index[band]
+            keys.discard(key)
+            if not keys:
+                del index[band]
+
+
+# Example usage
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+
+    def product_photo(seed: int) -> np.ndarray:
+        # Smooth blobs stand in for a product on a plain background
+        r = np.random.default_rng(seed)
+        y, x = np.mgrid[0:480, 0:640]
+        photo = np.zeros((480, 640, 3))
+        for _ in range(12):
+            cy, cx, radius = r.uniform(0, 480), r.uniform(0, 640), r.uniform(40, 160)
+            photo += r.uniform(20, 80, 3) * np.exp(-((y - cy) ** 2 + (x - cx) ** 2) / (2 * radius ** 2))[..., None]
+        return photo
+
+    def jpeg(photo: np.ndarray) -> bytes:
+        buffer = io.BytesIO()
+        Image.fromarray(np.clip(photo, 0, 255).astype(np.uint8)).save(buffer, format='JPEG', quality=90)
+        return buffer.getvalue()
+
+    products = [product_photo(seed) for seed in range(200)]
+    cache = PerceptualCache(max_entries=1000)
+    for i, photo in enumerate(products):
+        key, thumb = image_signature(jpeg(photo))
+        cache.put(key, {'product': i}, thumb)
+
+    # Re-scans: same product with sensor noise and a brightness change
+    correct, wrong, signature_times, lookup_times = 0, 0, [], []
+    for i, photo in enumerate(products):
+        rescan = jpeg(photo * 1.05 + rng.normal(0, 3, photo.shape))
+        started = time.perf_counter()
+        key, thumb = image_signature(rescan)
+        signed = time.perf_counter()
+        result = cache.get(key, thumb)
+        signature_times.append(signed - started)
+        lookup_times.append(time.perf_counter() - signed)
+        correct += result is not None and result['product'] == i
+        wrong += result is not None and result['product'] != i
+
+    print(f"Re-scans matched to the right product: {correct}/{len(products)}, to a different one: {wrong}")
+    print(f"Signature of a 640x480 JPEG: {np.mean(signature_times) * 1000:.2f}ms, "
+          f"cache lookup: {np.mean(lookup_times) * 1e6:.1f}us")
+    print(f"Cache stats: {cache.stats()}")
@@ -4,14 +4,19 @@ from tensorflow.keras.applications import EfficientNetB0
 from tensorflow.keras.applications.efficientnet import preprocess_input, decode_predictions
 from tensorflow.keras.preprocessing import image
 from PIL import Image
+import copy
 import io
+from models.vision.perceptual_cache import PerceptualCache, image_signature
 
 class ProductClassifier:
-    def __init__(self):
+    def __init__(self, cache_size=4096, cache_ttl_seconds=3600.0):
         # Load pre-trained EfficientNetB0 model with top layer for classification
         self.model = EfficientNetB0(weights='imagenet', include_top=True)
         print("EfficientNetB0 model loaded successfully (with classification head).")
         
+        # Re-scans of the same SKU are answered from a perceptual-hash cache; cache_size=0 disables it
+        self.cache = PerceptualCache(cache_size, cache_ttl_seconds) if cache_size else None
+        
         # Expanded and categorized keyword lists for better classification
         self.soft_keywords = {
             # Textiles and fabrics
@@ -69,6 +74,27 @@ class ProductClassifier:
             'book', 'pen', 'pencil', 'ruler', 'scissors', 'stapler', 'calculator',
             'watch', 'sunglasses', 'umbrella', 'can', 'container', 'box'
         }
+        
+        self.compile_class_table()
+
+    def compile_class_table(self):
+        """
+        Classify every ImageNet class once so predictions are scored with array lookups.
+        Row i of the identity matrix decodes to the label of class i.
+        """
+        num_classes = self.model.output_shape[-1]
+        self.class_labels = [row[0][1] for row in decode_predictions(np.eye(num_classes), top=1)]
+        table = [self.classify_object(label, 1.0) for label in self.class_labels]
+        
+        self.class_is_soft = np.array([is_soft for is_soft, _, _ in table])
+        self.class_hardness = np.array([hardness for _, hardness, _ in table])
+        self.class_match_strength = np.array([strength for _, _, strength in table])
+        # Columns of one dot product: soft weight, hard weight, weighted hardness
+        self.class_scores = np.column_stack([self.class_is_soft, ~self.class_is_soft, self.class_hardness]).astype(np.float64)
+
+    def warm_up(self):
+        """Run one dummy inference so the first real prediction skips graph tracing"""
+        self.model.predict(np.zeros((1, 224, 224, 3), dtype=np.float32), verbose=0)
 
     def preprocess_image(self, img_bytes):
         """Preprocess image for EfficientNet model"""
@@ -119,44 +145,81 @@ class ProductClassifier:
         Predict product classification with improved accuracy.
         Uses top-5 predictions and weighted scoring for better results.
         """
+        return self.predict_batch([img_bytes])[0]
+
+    def cached_result(self, img_bytes):
+        """
+        Look an image up in the result cache without touching the model.
+        Returns (signature, result); result is None on a miss, signature is None
+        when caching is off or the image does not decode.
+        """
+        if self.cache is None:
+            return None, None
         try:
-            processed_img = self.preprocess_image(img_bytes)
-            
-            # Get predictions from the model
-            preds = self.model.predict(processed_img, verbose=0)
+            signature = image_signature(img_bytes)
+        except Exception:
+            return None, None
+        cached = self.cache.get(*signature)
+        return signature, copy.deepcopy(cached) if cached is not None else None
+
+    def predict_batch(self, images, signatures=None):
+        """
+        Classify several images with a single forward pass.
+        Images that fail to decode get the fallback result without failing the batch.
+        Near-duplicates of earlier scans are served from the cache and skip the model;
+        ``signatures`` marks images the caller already looked up with ``cached_result``
+        (None entries are looked up here).
+        """
+        signatures = list(signatures) if signatures is not None else [None] * len(images)
+        results = [None] * len(images)
+        batch, positions = [], []
+        for i, img_bytes in enumerate(images):
+            if signatures[i] is None:
+                signatures[i], results[i] = self.cached_result(img_bytes)
+                if results[i] is not None:
+                    continue
+            try:
+                batch.append(self.preprocess_image(img_bytes))
+                positions.append(i)
+            except Exception as e:
+                results[i] = self.error_result(e)
+        
+        if batch:
+            try:
+                # Get predictions from the model
+                preds = self.model.predict(np.concatenate(batch), batch_size=len(batch), verbose=0)
+            except Exception as e:
+                for i in positions:
+                    results[i] = self.error_result(e)
+                return results
             
-            # Decode top 5 predictions for better analysis
-            decoded_preds = decode_predictions(preds, top=5)[0]
+            for i, row in zip(positions, preds):
+                results[i] = self.analyze_predictions(row[np.newaxis, :])
+                # Failed analyses are not cached so the next scan retries them
+                if signatures[i] is not None and results[i]["classification"] != "Unknown":
+                    key, thumb = signatures[i]
+                    self.cache.put(key, copy.deepcopy(results[i]), thumb)
+        
+        return results
+
+    def analyze_predictions(self, preds):
+        """
+        Turn one image's class probabilities, shape (1, 1000), into the scan result.
+        """
+        try:
+            probs = np.asarray(preds, dtype=np.float64)[0]
             
-            # Analyze all top predictions with weighted scoring
-            weighted_soft_score = 0.0
-            weighted_hard_score = 0.0
-            weighted_hardness = 0.0
-            total_weight = 0.0
+            # Top 5 predictions, highest first
+            top = np.argpartition(probs, -5)[-5:]
+            top = top[np.argsort(probs[top])[::-1]]
             
-            classification_details = []
+            # Weight decreases for lower-ranked predictions; top prediction has full weight, other classes none
+            weights = np.zeros_like(probs)
+            weights[top] = probs[top] * (1.0 - np.arange(len(top)) * 0.15)
+            total_weight = weights.sum()
             
-            for idx, (class_id, label_name, conf) in enumerate(decoded_preds):
-                # Weight decreases for lower-ranked predictions
-                weight = conf * (1.0 - idx * 0.15)  # Top prediction has full weight
-                
-                is_soft, hardness_score, match_strength = self.classify_object(label_name, conf)
-                
-                if is_soft:
-                    weighted_soft_score += weight
-                else:
-                    weighted_hard_score += weight
-                
-                weighted_hardness += hardness_score * weight
-                total_weight += weight
-                
-                classification_details.append({
-                    'label': label_name,
-                    'confidence': float(conf),
-                    'is_soft': is_soft,
-                    'hardness': hardness_score,
-                    'match_strength': match_strength
-                })
+            # Weighted scoring of all classes against the precompiled table
+            weighted_soft_score, weighted_hard_score, weighted_hardness = weights @ self.class_scores
             
             # Normalize weighted scores
             if total_weight > 0:
@@ -164,13 +227,23 @@ class ProductClassifier:
                 weighted_hard_score /= total_weight
                 weighted_hardness /= total_weight
             
+            classification_details = [
+                {
+                    'label': self.class_labels[i],
+                    'confidence': float(probs[i]),
+                    'is_soft': bool(self.class_is_soft[i]),
+                    'hardness': float(self.class_hardness[i]),
+                    'match_strength': int(self.class_match_strength[i])
+                }
+                for i in top
+            ]
+            
             # Final classification based on weighted analysis
             is_soft_final = weighted_soft_score > weighted_hard_score
             
             # Get primary detected object (top prediction)
-            top_pred = decoded_preds[0]
-            primary_label = top_pred[1]
-            primary_confidence = float(top_pred[2])
+            primary_label = self.class_labels[top[0]]
+            primary_confidence = float(probs[top[0]])
             
             # Adjust confidence based on prediction agreement
             # If top predictions agree, confidence is higher
@@ -242,27 +315,28 @@ class ProductClassifier:
             return result
             
         except Exception as e:
-            print(f"Error during prediction: {e}")
-            import traceback
-            traceback.print_exc()
-            
-            # Fallback with error details
-            return {
-                "classification": "Unknown",
-                "detected_object": "Error - Unable to analyze",
-                "hardness_score": 0.5,
-                "confidence": 0.0,
-                "fragility_class": "Medium",
-                "recommended_zone": "Zone C (Manual Inspection Required)",
-                "handling_instructions": "Unable to analyze automatically. Please inspect manually and classify based on visual assessment.",
-                "analysis_details": {
-                    "error": str(e),
-                    "top_predictions": [],
-                    "soft_likelihood": 0.0,
-                    "hard_likelihood": 0.0,
-                    "agreement_score": 0.0
-                }
-            }
+            return self.error_result(e)
 
-# Singleton instance
-classifier = ProductClassifier()
+    def error_result(self, e):
+        """Fallback result asking for manual inspection"""
+        print(f"Error during prediction: {e}")
+        import traceback
+        traceback.print_exc()
+        
+        # Fallback with error details
+        return {
+            "classification": "Unknown",
+            "detected_object": "Error - Unable to analyze",
+            "hardness_score": 0.5,
+            "confidence": 0.0,
+            "fragility_class": "Medium",
+            "recommended_zone": "Zone C (Manual Inspection Required)",
+            "handling_instructions": "Unable to analyze automatically. Please inspect manually and classify based on visual assessment.",
+            "analysis_details": {
+                "error": str(e),
+                "top_predictions": [],
+                "soft_likelihood": 0.0,
+                "hard_likelihood": 0.0,
+                "agreement_score": 0.0
+            }
+        }
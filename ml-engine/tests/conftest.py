@@ -0,0 +1,8 @@
+"""
+Shared pytest setup for the ML engine
+"""
+import sys
+from pathlib import Path
+
+# Modules import each other as ``models.*``, relative to the ml-engine directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,88 @@
+"""
+Tests for the incremental spatial anomaly index
+"""
+import numpy as np
+import pandas as pd
+from sklearn.cluster import DBSCAN
+
+from models.clustering.anomaly_index import SpatialAnomalyIndex
+
+# Tight enough that the clusters have non-core border points as well as noise
+EPS = 0.3
+MIN_SAMPLES = 6
+
+
+def make_items(n_clustered: int = 150, n_scattered: int = 15, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    centers = np.array([[10.0, 10.0, 50.0], [40.0, 25.0, 120.0], [25.0, 45.0, 15.0]])
+    clustered = centers[rng.integers(0, len(centers), n_clustered)] + rng.normal(0, [2.0, 2.0, 8.0], (n_clustered, 3))
+    scattered = rng.uniform([0, 0, 0], [50, 50, 200], (n_scattered, 3))
+    features = np.vstack((clustered, scattered))
+    return pd.DataFrame({
+        'item_id': [f"ITEM-{i:04d}" for i in range(len(features))],
+        'x': features[:, 0],
+        'y': features[:, 1],
+        'movement_freq': features[:, 2]
+    })
+
+
+def dbscan_noise(index: SpatialAnomalyIndex) -> set:
+    rows = np.flatnonzero(index.active)
+    labels = DBSCAN(eps=EPS, min_samples=MIN_SAMPLES).fit(index.points[rows]).labels_
+    return {index.ids[row] for row in rows[labels == -1]}
+
+
+def brute_force_counts(index: SpatialAnomalyIndex) -> dict:
+    rows = np.flatnonzero(index.active)
+    points = index.points[rows]
+    dist = np.sqrt(((points[:, None, :] - points[None, :, :]) ** 2).sum(axis=2))
+    return {index.ids[row]: int(count) for row, count in zip(rows, (dist <= EPS).sum(axis=1))}
+
+
+def index_counts(index: SpatialAnomalyIndex) -> dict:
+    return {item_id: int(index.counts[row]) for item_id, row in index.row_of.items()}
+
+
+def test_build_matches_dbscan_noise():
+    index = SpatialAnomalyIndex(eps=EPS, min_samples=MIN_SAMPLES).build(make_items())
+
+    expected = dbscan_noise(index)
+    border = {item_id for item_id, count in index_counts(index).items() if count < MIN_SAMPLES} - expected
+    assert expected and border, "the fixture should contain noise and border points"
+    assert set(index.anomalies()) == expected
+    assert index_counts(index) == brute_force_counts(index)
+
+
+def test_upsert_and_remove_keep_counts_and_labels():
+    items = make_items()
+    index = SpatialAnomalyIndex(eps=EPS, min_samples=MIN_SAMPLES).build(items)
+    rng = np.random.default_rng(3)
+    raw = items[['x', 'y', 'movement_freq']].to_numpy()
+
+    for step in range(60):
+        action = step % 3
+        if action == 0:
+            # New item next to an existing one, so it lands in a populated bucket
+            index.upsert(f"NEW-{step}", raw[rng.integers(len(raw))] + rng.normal(0, 1.0, 3))
+        elif action == 1:
+            item_id = rng.choice(list(index.row_of))
+            index.upsert(item_id, index.raw[index.row_of[item_id]] + rng.normal(0, 3.0, 3))
+        else:
+            index.remove(rng.choice(list(index.row_of)))
+
+        assert index_counts(index) == brute_force_counts(index)
+
+    expected = dbscan_noise(index)
+    assert set(index.anomalies()) == expected
+    for item_id in index.row_of:
+        assert index.check(item_id)['is_anomaly'] == (item_id in expected)
+
+
+def test_removed_items_are_not_reported():
+    index = SpatialAnomalyIndex(eps=EPS, min_samples=MIN_SAMPLES).build(make_items())
+    flagged = index.anomalies()
+
+    index.remove(flagged[0])
+
+    assert flagged[0] not in index.anomalies()
+    assert flagged[0] not in index.row_of
@@ -0,0 +1,114 @@
+"""
+Tests for the picking-route cache and warm starts
+"""
+import numpy as np
+
+from models.optimization.route_cache import RouteCache, warm_start_order
+from models.optimization.route_optimizer import RouteOptimizer
+
+LAYOUT = 'layout-v1'
+START = (0, 0)
+END = (0, 0)
+
+
+def result_for(route, distance=10):
+    return {
+        'route': route,
+        'total_distance': distance,
+        'num_locations': len(route) - 2,
+        'estimated_time_seconds': distance * 5,
+        'optimization_status': 'success'
+    }
+
+
+def assert_valid_tour(result, start, picks, end):
+    route = [tuple(p) for p in result['route']]
+    assert route[0] == tuple(start) and route[-1] == tuple(end)
+    assert sorted(route[1:-1]) == sorted(tuple(p) for p in picks)
+    legs = sum(abs(a[0] - b[0]) + abs(a[1] - b[1]) for a, b in zip(route, route[1:]))
+    assert result['total_distance'] == legs
+
+
+def test_key_ignores_pick_order_and_float_noise():
+    picks = [(3, 4), (10, 2), (7, 7)]
+    key = RouteCache.key(START, picks, END, LAYOUT)
+
+    assert RouteCache.key(START, picks[::-1], END, LAYOUT) == key
+    assert RouteCache.key(START, [(2.9999999, 4.0000001), (10.0, 2.0), (7, 6.9999998)], END, LAYOUT) == key
+    assert RouteCache.key((1e-9, -1e-9), picks, END, LAYOUT) == key
+
+    assert RouteCache.key(START, picks, END, 'layout-v2') != key
+    assert RouteCache.key(START, picks[:2], END, LAYOUT) != key
+    assert RouteCache.key(START, picks + [(3, 4)], END, LAYOUT) != key
+
+
+def test_reordered_noisy_pick_list_is_a_hit():
+    cache = RouteCache()
+    picks = [(3, 4), (10, 2), (7, 7)]
+    cache.put(START, picks, END, LAYOUT, result_for([START, (3, 4), (7, 7), (10, 2), END]))
+
+    hit = cache.get(START, [(7.0000001, 7), (10, 1.9999999), (3, 4)], END, LAYOUT)
+
+    assert hit is not None and hit['cache_status'] == 'hit'
+    assert cache.get(START, picks, END, 'layout-v2') is None
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = RouteCache(max_entries=2)
+    a, b, c = [(1, 1), (2, 2)], [(5, 5), (6, 6)], [(9, 9), (8, 8)]
+    cache.put(START, a, END, LAYOUT, result_for([START, *a, END]))
+    cache.put(START, b, END, LAYOUT, result_for([START, *b, END]))
+    assert cache.get(START, a, END, LAYOUT) is not None
+
+    cache.put(START, c, END, LAYOUT, result_for([START, *c, END]))
+
+    assert cache.stats()['entries'] == 2
+    assert cache.get(START, b, END, LAYOUT) is None
+    assert cache.get(START, a, END, LAYOUT) is not None
+    assert cache.get(START, c, END, LAYOUT) is not None
+    # The evicted entry is gone from the overlap index too
+    assert cache.closest(START, b, END, LAYOUT) is None
+    evicted = RouteCache.key(START, b, END, LAYOUT)
+    assert not any(evicted in keys for keys in cache.pick_index.values())
+
+
+def test_failed_results_are_not_cached():
+    cache = RouteCache()
+    cache.put(START, [(1, 1)], END, LAYOUT, {'route': [], 'total_distance': 0, 'optimization_status': 'failed'})
+
+    assert cache.stats()['entries'] == 0
+
+
+def test_warm_start_order_keeps_shared_order_and_inserts_new_picks():
+    cached_route = [START, (5, 0), (5, 5), (0, 5), END]
+    all_locations = [START, (0, 5), (5, 5), (5, 0), (3, 5), END]
+    points = np.array(all_locations)
+    distance_matrix = np.abs(points[:, None, :] - points[None, :, :]).sum(axis=-1)
+
+    order = warm_start_order(cached_route, all_locations, distance_matrix)
+
+    assert sorted(order) == [1, 2, 3, 4]
+    shared = [node for node in order if node != 4]
+    assert shared == [3, 2, 1]
+    # (3, 5) lies on the leg from (5, 5) to (0, 5), so inserting it there costs nothing
+    assert order == [3, 2, 4, 1]
+
+
+def test_warm_start_is_valid_and_no_worse_than_cold_solve():
+    rng = np.random.default_rng(11)
+    cells = rng.choice(30 * 30, size=16, replace=False)
+    picks = [(int(cell % 30), int(cell // 30)) for cell in cells]
+    previous, current = picks[:12], picks[2:]
+
+    cold = RouteOptimizer(30, 30).optimize_picking_route(START, current, END, time_limit_seconds=1)
+
+    optimizer = RouteOptimizer(30, 30, route_cache=RouteCache(min_overlap=0.5))
+    optimizer.optimize_picking_route(START, previous, END, time_limit_seconds=1)
+    warm = optimizer.optimize_picking_route(START, current, END, time_limit_seconds=1)
+
+    assert warm['cache_status'] == 'warm_start'
+    assert optimizer.route_cache.stats()['partial_hits'] == 1
+    assert_valid_tour(cold, START, current, END)
+    assert_valid_tour(warm, START, current, END)
+    assert warm['total_distance'] <= cold['total_distance']
@@ -0,0 +1,115 @@
+"""
+Tests for the simulated-annealing and genetic slotting search
+"""
+import numpy as np
+import pytest
+
+from models.clustering.picking_distance import PickingDistanceEvaluator
+from models.clustering.slotting import ALGORITHMS, SlottingOptimizer, SlottingProblem, _crossover, genetic, simulated_annealing
+
+GRID = 20
+N_ITEMS = 120
+
+
+def make_problem(seed: int = 0, relocation_weight: float = 0.5):
+    rng = np.random.default_rng(seed)
+    evaluator = PickingDistanceEvaluator(GRID, GRID)
+    optimizer = SlottingOptimizer(evaluator, relocation_weight=relocation_weight)
+    cells = rng.choice(GRID * GRID, size=N_ITEMS, replace=False)
+    locations = np.column_stack((cells % GRID, cells // GRID))
+    frequencies = rng.pareto(1.5, N_ITEMS) * 10 + 1
+    slot_distance = np.asarray(evaluator.location_distances(optimizer.slots), dtype=np.float64)
+    problem = SlottingProblem(frequencies, locations, optimizer.slots, slot_distance, relocation_weight)
+    return optimizer, problem, frequencies, locations
+
+
+def assert_permutation(perm: np.ndarray, n_slots: int):
+    assert perm.shape == (n_slots,)
+    assert np.array_equal(np.sort(perm), np.arange(n_slots))
+
+
+def test_swap_delta_matches_full_recompute():
+    _, problem, _, _ = make_problem()
+    rng = np.random.default_rng(1)
+    perm = rng.permutation(problem.n_slots)
+
+    for _ in range(200):
+        a = rng.integers(0, problem.n_items)
+        b = rng.integers(0, problem.n_slots)
+        swapped = perm.copy()
+        swapped[a], swapped[b] = swapped[b], swapped[a]
+        delta = problem.swap_delta(perm, np.array([a]), np.array([b]))[0]
+        assert delta == pytest.approx(problem.total(swapped) - problem.total(perm), abs=1e-6)
+        perm = swapped
+
+
+def test_batched_disjoint_swaps_add_up():
+    _, problem, _, _ = make_problem()
+    rng = np.random.default_rng(2)
+    perm = rng.permutation(problem.n_slots)
+
+    for _ in range(20):
+        a, b = problem.propose(rng, 32)
+        assert len(set(a.tolist()) | set(b.tolist())) == 2 * len(a)
+        before = problem.total(perm)
+        delta = problem.swap_delta(perm, a, b)
+        perm[a], perm[b] = perm[b], perm[a]
+        assert delta.sum() == pytest.approx(problem.total(perm) - before, abs=1e-6)
+
+
+def test_initial_assignment_keeps_items_in_place():
+    optimizer, problem, _, locations = make_problem()
+
+    perm = optimizer._initial_assignment(locations)
+
+    assert_permutation(perm, problem.n_slots)
+    assert np.array_equal(optimizer.slots[perm[:N_ITEMS]], locations)
+
+
+def test_initial_assignment_separates_items_sharing_a_slot():
+    optimizer, problem, _, locations = make_problem()
+    locations = locations.copy()
+    locations[1] = locations[0]
+
+    perm = optimizer._initial_assignment(locations)
+
+    assert_permutation(perm, problem.n_slots)
+    assert np.array_equal(optimizer.slots[perm[0]], locations[0])
+
+
+def test_crossover_gives_a_permutation():
+    _, problem, _, _ = make_problem()
+    rng = np.random.default_rng(3)
+
+    for _ in range(50):
+        child = _crossover(rng.permutation(problem.n_slots), rng.permutation(problem.n_slots), problem.n_items, rng)
+        assert_permutation(child, problem.n_slots)
+
+
+@pytest.mark.parametrize('search', [simulated_annealing, genetic])
+def test_search_returns_a_no_worse_permutation(search):
+    optimizer, problem, _, locations = make_problem()
+    initial = optimizer._initial_assignment(locations)
+
+    result = search(problem, initial, time_budget=1.0, seed=0)
+
+    assert_permutation(result['perm'], problem.n_slots)
+    assert result['cost'] == pytest.approx(problem.total(result['perm']))
+    assert result['cost'] <= problem.total(initial) + 1e-9
+
+
+@pytest.mark.parametrize('algorithm', ALGORITHMS)
+def test_optimize_improves_within_budget(algorithm):
+    optimizer, _, frequencies, locations = make_problem()
+    time_budget = 2.0
+
+    result = optimizer.optimize(frequencies, locations, algorithm=algorithm, time_budget=time_budget, restarts=2, n_jobs=1)
+
+    new_locations = result['locations']
+    assert new_locations.shape == locations.shape
+    # Every item in its own grid cell
+    assert len({tuple(xy) for xy in new_locations.tolist()}) == N_ITEMS
+    assert result['objective_after'] < result['objective_before']
+    assert result['elapsed_seconds'] <= time_budget + 0.5
+    moved = np.flatnonzero((new_locations != locations).any(axis=1))
+    assert np.array_equal(result['moved_items'], moved)